@@ -1,9 +1,31 @@
 from researchd import create_app
 from researchd.seed import seed
+from researchd.search_index import reindex_search
+from researchd.facets import rebuild_facets_command
+from researchd.backfill import backfill_keywords
+from researchd.fast_keywords import rebuild_keyword_stats_command
+from researchd.file_text import rebuild_file_text
+from researchd.profile_loader import rebuild_profile_snapshots_command
+from researchd.storage import migrate_uploads
+from researchd.avatars import process_avatars
+from researchd.thumbnails import build_thumbnails
+from researchd.storage_gc import storage_gc
+from researchd.jobs import recover_extraction_jobs
 
 app = create_app()
 
 app.cli.add_command(seed)
+app.cli.add_command(reindex_search)
+app.cli.add_command(rebuild_facets_command)
+app.cli.add_command(backfill_keywords)
+app.cli.add_command(rebuild_keyword_stats_command)
+app.cli.add_command(rebuild_file_text)
+app.cli.add_command(rebuild_profile_snapshots_command)
+app.cli.add_command(migrate_uploads)
+app.cli.add_command(process_avatars)
+app.cli.add_command(build_thumbnails)
+app.cli.add_command(storage_gc)
+app.cli.add_command(recover_extraction_jobs)
 
 if __name__ == "__main__":
     with app.app_context():
@@ -51,6 +51,25 @@ def get_metadata():
     return target_db.metadata
 
 
+# The full-text indexes are created with raw SQL by their migrations and have no models:
+# SQLite FTS5 tables plus their shadow tables (<name>_data, _idx, ...), PostgreSQL tsvector
+# side tables and the generated publications.search_vector column with its GIN index.
+SEARCH_INDEX_TABLES = ('publications_fts', 'researchers_fts', 'file_pages_fts')
+SEARCH_INDEX_COLUMNS = ('search_vector',)
+SEARCH_INDEX_INDEXES = ('ix_publications_search_vector',)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping the search indexes"""
+    if type_ == 'table' and name.startswith(SEARCH_INDEX_TABLES):
+        return False
+    if type_ == 'column' and name in SEARCH_INDEX_COLUMNS and object.table.name == 'publications':
+        return False
+    if type_ == 'index' and name in SEARCH_INDEX_INDEXES:
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +84,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +113,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
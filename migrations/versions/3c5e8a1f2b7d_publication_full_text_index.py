@@ -0,0 +1,73 @@
+"""Publication full-text index
+
+Revision ID: 3c5e8a1f2b7d
+Revises: 97477c89b8c6
+Create Date: 2025-10-20 10:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e8a1f2b7d'
+down_revision = '97477c89b8c6'
+branch_labels = None
+depends_on = None
+
+
+# The index as of this revision; researchd.search_index moves on with the models
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS publications_fts USING fts5(
+        title, authors, journal, abstract, keywords,
+        content='publications', content_rowid='pubid',
+        tokenize='porter unicode61', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS publications_fts_ai AFTER INSERT ON publications BEGIN
+        INSERT INTO publications_fts(rowid, title, authors, journal, abstract, keywords)
+        VALUES (new.pubid, new.title, new.authors, new.journal, new.abstract, new.keywords);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS publications_fts_ad AFTER DELETE ON publications BEGIN
+        INSERT INTO publications_fts(publications_fts, rowid, title, authors, journal, abstract, keywords)
+        VALUES ('delete', old.pubid, old.title, old.authors, old.journal, old.abstract, old.keywords);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS publications_fts_au AFTER UPDATE ON publications BEGIN
+        INSERT INTO publications_fts(publications_fts, rowid, title, authors, journal, abstract, keywords)
+        VALUES ('delete', old.pubid, old.title, old.authors, old.journal, old.abstract, old.keywords);
+        INSERT INTO publications_fts(rowid, title, authors, journal, abstract, keywords)
+        VALUES (new.pubid, new.title, new.authors, new.journal, new.abstract, new.keywords);
+    END""",
+    "INSERT INTO publications_fts(publications_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_INDEX = [
+    """ALTER TABLE publications ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(keywords, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(authors, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(journal, '')), 'C') ||
+            setweight(to_tsvector('english', coalesce(abstract, '')), 'D')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_publications_search_vector ON publications USING GIN (search_vector)",
+]
+
+
+def upgrade():
+    # Creates the FTS5 table + sync triggers (SQLite) or the tsvector column + GIN index (PostgreSQL),
+    # then backfills it from the existing publications
+    dialect = op.get_bind().dialect.name
+    statements = SQLITE_INDEX if dialect == 'sqlite' else POSTGRES_INDEX if dialect == 'postgresql' else []
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('publications_fts_ai', 'publications_fts_ad', 'publications_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS publications_fts')
+    elif bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_publications_search_vector')
+        op.execute('ALTER TABLE publications DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,47 @@
+"""Modification timestamps
+
+Revision ID: 4a8c1e6f3b92
+Revises: 9e2d7b4f1a65
+Create Date: 2025-10-27 11:06:18.542907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a8c1e6f3b92'
+down_revision = '9e2d7b4f1a65'
+branch_labels = None
+depends_on = None
+
+
+# table -> column the existing rows take their first updated_at from
+TABLES = {
+    'profiles': None,
+    'education': None,
+    'experience': None,
+    'achievement': None,
+    'external_roles': None,
+    'socials': None,
+    'files': 'uploaded_at',
+    'photos': 'uploaded_at',
+    'publications': 'created_at',
+}
+
+
+def upgrade():
+    for table, source in TABLES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        # SQLite can't add a column with a CURRENT_TIMESTAMP default, so fill it in afterwards
+        if source:
+            op.execute(f'UPDATE {table} SET updated_at = COALESCE({source}, CURRENT_TIMESTAMP)')
+        else:
+            op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+
+
+def downgrade():
+    for table in reversed(list(TABLES)):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,71 @@
+"""Researcher search index
+
+Revision ID: 8d2f4b6a9c13
+Revises: 3c5e8a1f2b7d
+Create Date: 2025-10-20 14:37:05.502871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f4b6a9c13'
+down_revision = '3c5e8a1f2b7d'
+branch_labels = None
+depends_on = None
+
+
+# The schema and index as of this revision; researchd.search_index moves on with the models
+users = sa.table('user', sa.column('id', sa.Integer), sa.column('first_name', sa.String), sa.column('last_name', sa.String))
+profiles = sa.table('profiles', sa.column('user_id', sa.Integer), sa.column('institution', sa.String),
+                    sa.column('position', sa.String), sa.column('research_interests', sa.Text))
+
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS researchers_fts USING fts5(
+        first_name, last_name, institution, position, research_interests,
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+]
+SQLITE_INSERT = """INSERT INTO researchers_fts (rowid, first_name, last_name, institution, position, research_interests)
+    VALUES (:user_id, :first_name, :last_name, :institution, :position, :research_interests)"""
+
+POSTGRES_INDEX = [
+    """CREATE TABLE IF NOT EXISTS researchers_fts (
+        user_id INTEGER PRIMARY KEY REFERENCES "user"(id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_researchers_fts_document ON researchers_fts USING GIN (document)",
+]
+POSTGRES_INSERT = """INSERT INTO researchers_fts (user_id, document) VALUES (:user_id,
+    setweight(to_tsvector('simple', coalesce(:first_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(:last_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(:research_interests, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(:institution, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(:position, '')), 'C'))"""
+
+
+def upgrade():
+    # Creates the researcher index table and fills it from user + profiles
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        statements, insert = SQLITE_INDEX, SQLITE_INSERT
+    elif bind.dialect.name == 'postgresql':
+        statements, insert = POSTGRES_INDEX, POSTGRES_INSERT
+    else:
+        return
+    for statement in statements:
+        op.execute(statement)
+
+    rows = bind.execute(
+        sa.select(users.c.id.label('user_id'), users.c.first_name, users.c.last_name,
+                  profiles.c.institution, profiles.c.position, profiles.c.research_interests)
+        .join(profiles, profiles.c.user_id == users.c.id)
+    ).mappings().all()
+    if rows:
+        bind.execute(sa.text(insert), [dict(row) for row in rows])
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('sqlite', 'postgresql'):
+        op.execute('DROP TABLE IF EXISTS researchers_fts')
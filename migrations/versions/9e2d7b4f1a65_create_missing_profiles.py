@@ -0,0 +1,56 @@
+"""Create missing profiles
+
+Revision ID: 9e2d7b4f1a65
+Revises: 7c3f5a9e2d01
+Create Date: 2025-10-26 15:20:04.871392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2d7b4f1a65'
+down_revision = '7c3f5a9e2d01'
+branch_labels = None
+depends_on = None
+
+
+users = sa.table('user', sa.column('id', sa.Integer), sa.column('first_name', sa.String), sa.column('last_name', sa.String))
+profiles = sa.table('profiles', sa.column('pid', sa.Integer), sa.column('user_id', sa.Integer), sa.column('pfp', sa.String))
+
+# Researcher index rows as of this revision (a new profile has no institution, position or interests)
+SQLITE_INDEX_ROW = [
+    "DELETE FROM researchers_fts WHERE rowid = :user_id",
+    """INSERT INTO researchers_fts (rowid, first_name, last_name, institution, position, research_interests)
+        VALUES (:user_id, :first_name, :last_name, NULL, NULL, '')""",
+]
+POSTGRES_INDEX_ROW = [
+    """INSERT INTO researchers_fts (user_id, document) VALUES (:user_id,
+        setweight(to_tsvector('simple', coalesce(:first_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(:last_name, '')), 'A'))
+        ON CONFLICT (user_id) DO UPDATE SET document = excluded.document""",
+]
+
+
+def upgrade():
+    # Profile pages no longer create a missing profile on GET, so every user gets one up front
+    bind = op.get_bind()
+    missing = bind.execute(
+        sa.select(users.c.id).where(~sa.exists().where(profiles.c.user_id == users.c.id))
+    ).scalars().all()
+    if missing:
+        op.bulk_insert(profiles, [{'user_id': user_id, 'pfp': 'default_pfp.png'} for user_id in missing])
+
+        # Researchers are only indexed once they have a profile
+        statements = {'sqlite': SQLITE_INDEX_ROW, 'postgresql': POSTGRES_INDEX_ROW}.get(bind.dialect.name, [])
+        names = [dict(row) for row in bind.execute(
+            sa.select(users.c.id.label('user_id'), users.c.first_name, users.c.last_name).where(users.c.id.in_(missing))
+        ).mappings()]
+        for statement in statements:
+            bind.execute(sa.text(statement), names)
+
+
+def downgrade():
+    # Profiles created here can't be told apart from real ones; nothing to undo
+    pass
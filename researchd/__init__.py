@@ -1,5 +1,6 @@
-from flask import Flask
+from flask import Flask, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from flask_migrate import Migrate
@@ -7,18 +8,99 @@ import os
 from sqlalchemy import inspect
 from flask_login import current_user
 
-db = SQLAlchemy()
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
+REPLICA_BIND = "replica"
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs made while handling GET/HEAD/OPTIONS requests to the read replica
+    (SQLALCHEMY_BINDS["replica"], set from READ_DATABASE_URL) and everything else,
+    including any flush, to the primary database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and request.method in READ_ONLY_METHODS:
+            if self._flushing:
+                # GET handlers are meant to be read-only; the write still goes to the primary
+                print(f"Warning: database write while handling {request.method} {request.path}")
+            elif getattr(clause, "is_select", False):
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 csrf = CSRFProtect()
 migrate = Migrate()
 
-def create_app():
+def create_app(preload=None):
+    """
+    Build the app. preload=True imports PyMuPDF up front and has the job pool's processes
+    load the keyword model as they start; by default KEYBERT_PRELOAD decides.
+    """
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "devkey")
     
     basedir = os.path.abspath(os.path.dirname(__file__))
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(basedir, "researchd.sqlite")
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///" + os.path.join(basedir, "researchd.sqlite"))
 
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # Optional read-only connection for GET requests, e.g. a replica, or for SQLite a
+    # read-only handle: sqlite:///file:/path/to/researchd.sqlite?mode=ro&uri=true
+    read_database_url = os.environ.get("READ_DATABASE_URL")
+    if read_database_url:
+        app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: read_database_url}
+
+    # Maximum number of values shown in each /search filter dropdown
+    app.config["SEARCH_FACET_LIMIT"] = int(os.environ.get("SEARCH_FACET_LIMIT", 50))
+
+    # "keyset" pages /search results by cursor, "offset" uses numbered OFFSET/LIMIT pages
+    app.config["SEARCH_PAGINATION"] = os.environ.get("SEARCH_PAGINATION", "keyset")
+    # How long result totals are reused before COUNT(*) runs again
+    app.config["SEARCH_COUNT_CACHE_SECONDS"] = int(os.environ.get("SEARCH_COUNT_CACHE_SECONDS", 60))
+
+    # Load the KeyBERT model when the app starts instead of on the first extraction request
+    app.config["KEYBERT_PRELOAD"] = os.environ.get("KEYBERT_PRELOAD", "0").lower() in ("1", "true", "yes")
+
+    # Background keyword extraction: pool size, max queued/running jobs (429 beyond that),
+    # seconds before an unfinished job is considered abandoned, and retries after that
+    app.config["KEYWORD_WORKERS"] = int(os.environ.get("KEYWORD_WORKERS", 2))
+    app.config["KEYWORD_JOB_QUEUE_LIMIT"] = int(os.environ.get("KEYWORD_JOB_QUEUE_LIMIT", 20))
+    app.config["KEYWORD_JOB_TIMEOUT"] = int(os.environ.get("KEYWORD_JOB_TIMEOUT", 300))
+    app.config["KEYWORD_JOB_MAX_ATTEMPTS"] = int(os.environ.get("KEYWORD_JOB_MAX_ATTEMPTS", 2))
+
+    # Keyword engine used by /extract_keywords when the request doesn't pick one:
+    # "keybert" (model, background job), "fast" (TF-IDF over the publication corpus, no model)
+    # or "auto" (KeyBERT, falling back to fast when it isn't installed or the queue is full)
+    app.config["KEYWORD_ENGINE"] = os.environ.get("KEYWORD_ENGINE", "auto")
+
+    # Text budget for keyword extraction: the first N pages, capped at this many characters
+    app.config["KEYWORD_MAX_PAGES"] = int(os.environ.get("KEYWORD_MAX_PAGES", 10))
+    app.config["KEYWORD_MAX_CHARS"] = int(os.environ.get("KEYWORD_MAX_CHARS", 60000))
+
+    # Budget for the full text stored per uploaded file (much larger than the keyword budget)
+    app.config["FILE_TEXT_MAX_PAGES"] = int(os.environ.get("FILE_TEXT_MAX_PAGES", 500))
+    app.config["FILE_TEXT_MAX_CHARS"] = int(os.environ.get("FILE_TEXT_MAX_CHARS", 2000000))
+
+    # How uploads are sent: "stream" (from this process, with Range support), "x-sendfile"
+    # or "x-accel-redirect" (the front proxy reads the file; see researchd/downloads.py)
+    app.config["FILE_SERVING"] = os.environ.get("FILE_SERVING", "stream")
+    app.config["FILE_ACCEL_REDIRECT_PREFIX"] = os.environ.get("FILE_ACCEL_REDIRECT_PREFIX", "/protected-uploads/")
+    app.config["USE_X_SENDFILE"] = app.config["FILE_SERVING"] == "x-sendfile"
+
+    # Resumable paper uploads: largest accepted PDF, largest single chunk request, and how
+    # long an unfinished upload is kept. MAX_CONTENT_LENGTH also caps plain form uploads.
+    app.config["UPLOAD_MAX_BYTES"] = int(os.environ.get("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+    app.config["UPLOAD_CHUNK_BYTES"] = int(os.environ.get("UPLOAD_CHUNK_BYTES", 5 * 1024 * 1024))
+    app.config["UPLOAD_SESSION_TTL"] = int(os.environ.get("UPLOAD_SESSION_TTL", 24 * 60 * 60))
+    app.config["MAX_CONTENT_LENGTH"] = max(app.config["UPLOAD_MAX_BYTES"], app.config["UPLOAD_CHUNK_BYTES"]) + 1024 * 1024
+
+    # Limits for the PDF text/keyword cache keyed by content hash (least recently used evicted first)
+    app.config["EXTRACTION_CACHE_MAX_ENTRIES"] = int(os.environ.get("EXTRACTION_CACHE_MAX_ENTRIES", 5000))
+    app.config["EXTRACTION_CACHE_MAX_BYTES"] = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
     app.config["DEBUG"] = True
 
     db.init_app(app)
@@ -49,6 +131,15 @@ def create_app():
     app.register_blueprint(auth)
     app.register_blueprint(main)
 
+    from . import keywords
+    keywords.init_app(app, preload)
+
+    from . import avatars
+    avatars.init_app(app)
+
+    from . import thumbnails
+    thumbnails.init_app(app)
+
     with app.app_context():
         inspector = inspect(db.engine)
         print("Tables created:", inspector.get_table_names())
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, url_for
+from flask.cli import with_appcontext
+import click
+from . import db
+from .models import Profile
+from .jobs import get_executor
+
+# Uploaded profile pictures are kept as uploaded only until the background pool has
+# rendered them: decoded once, rotated upright from the EXIF orientation, cropped square
+# and saved at each of AVATAR_SIZES as WebP and JPEG under
+# static/profile_pics/avatars/<key>/. Saving without the EXIF block strips camera
+# metadata (including GPS). Templates pick a size per screen with srcset.
+
+AVATAR_SIZES = (64, 160, 400)
+AVATAR_DIRECTORY = "profile_pics/avatars"  # relative to static/
+DEFAULT_PICTURE = "default_pfp.png"
+
+
+def static_path(relative):
+    return os.path.join(current_app.root_path, "static", relative)
+
+
+def avatar_url(avatar_key, size, extension="jpg"):
+    return url_for("static", filename=f"{AVATAR_DIRECTORY}/{avatar_key}/{size}.{extension}")
+
+
+def avatar_srcset(avatar_key, extension="jpg"):
+    """srcset value listing every rendered size of an avatar"""
+    return ", ".join(f"{avatar_url(avatar_key, size, extension)} {size}w" for size in AVATAR_SIZES)
+
+
+def is_local_picture(pfp):
+    """Whether pfp is an uploaded file this app stores (not the default picture or a URL)"""
+    return bool(pfp) and pfp != DEFAULT_PICTURE and "://" not in pfp
+
+
+def render_avatar(source_path, output_root, pid):
+    """
+    Render one uploaded picture into every avatar size and format; runs in a pool process.
+    Returns the avatar key (the output directory name under output_root).
+    """
+    # Imported here so web workers that never touch images don't load Pillow
+    from PIL import Image, ImageOps
+
+    with open(source_path, "rb") as f:
+        data = f.read()
+    key = f"{pid}_{hashlib.sha256(data).hexdigest()[:16]}"
+    final = os.path.join(output_root, key)
+    if os.path.isdir(final):
+        return key
+
+    largest = max(AVATAR_SIZES)
+    image = Image.open(io.BytesIO(data))
+    # Lets the JPEG decoder scale down while decoding instead of inflating a full camera image
+    image.draft("RGB", (largest * 2, largest * 2))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    square = ImageOps.fit(image, (largest, largest), Image.LANCZOS)
+
+    temporary = os.path.join(output_root, f".{key}.{uuid.uuid4().hex}")
+    os.makedirs(temporary)
+    try:
+        for size in sorted(AVATAR_SIZES, reverse=True):
+            resized = square if size == largest else square.resize((size, size), Image.LANCZOS)
+            resized.save(os.path.join(temporary, f"{size}.webp"), "WEBP", quality=80, method=4)
+            if has_alpha:
+                flattened = Image.new("RGB", resized.size, (255, 255, 255))
+                flattened.paste(resized, mask=resized.getchannel("A"))
+                resized = flattened
+            resized.save(os.path.join(temporary, f"{size}.jpg"), "JPEG", quality=85, optimize=True, progressive=True)
+        os.replace(temporary, final)
+    except OSError:
+        shutil.rmtree(temporary, ignore_errors=True)
+        if not os.path.isdir(final):
+            raise
+    return key
+
+
+def remove_avatar_files(pfp, avatar_key):
+    """Delete an uploaded picture and its rendered sizes"""
+    if is_local_picture(pfp) and not pfp.startswith(AVATAR_DIRECTORY + "/"):
+        try:
+            os.remove(static_path(pfp))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing old profile picture: {e}")
+    if avatar_key:
+        shutil.rmtree(static_path(f"{AVATAR_DIRECTORY}/{avatar_key}"), ignore_errors=True)
+
+
+def apply_avatar(profile, avatar_key):
+    """Point a profile at its rendered avatar; returns the (pfp, avatar_key) it replaced"""
+    replaced = (profile.pfp, profile.avatar_key)
+    profile.avatar_key = avatar_key
+    profile.pfp = f"{AVATAR_DIRECTORY}/{avatar_key}/{max(AVATAR_SIZES)}.jpg"
+    return replaced
+
+
+def queue_avatar(app, profile):
+    """Render a just-uploaded profile picture on the background process pool"""
+    if not is_local_picture(profile.pfp) or profile.avatar_key:
+        return None
+    source = profile.pfp
+    output_root = static_path(AVATAR_DIRECTORY)
+    os.makedirs(output_root, exist_ok=True)
+    pid = profile.pid
+    future = get_executor(app).submit(render_avatar, static_path(source), output_root, pid)
+    future.add_done_callback(lambda f: _finish(app, pid, source, f))
+    return future
+
+
+def _finish(app, pid, source, future):
+    """Switch the profile to its rendered avatar; runs on the executor's callback thread"""
+    from .profile_loader import refresh_profile_snapshot
+
+    with app.app_context():
+        try:
+            key = future.result()
+            profile = db.session.get(Profile, pid)
+            # A newer picture may have been uploaded while this one was rendering
+            if profile is None or profile.pfp != source:
+                if profile is None or profile.avatar_key != key:
+                    remove_avatar_files(None, key)
+                return
+            old_pfp, old_key = apply_avatar(profile, key)
+            refresh_profile_snapshot(profile.user_id)
+            db.session.commit()
+            remove_avatar_files(old_pfp, old_key if old_key != key else None)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rendering profile picture for profile {pid}: {e}")
+        finally:
+            db.session.remove()
+
+
+@click.command("process-avatars")
+@click.option("--all", "process_all", is_flag=True, help="Re-render profiles that already have avatars.")
+@click.option("--workers", type=int, default=None, help="Image processes (default: KEYWORD_WORKERS).")
+@with_appcontext
+def process_avatars(process_all, workers):
+    """Render avatar sizes for uploaded profile pictures that don't have them yet."""
+    from .profile_loader import refresh_profile_snapshot
+
+    profiles = [profile for profile in Profile.query.order_by(Profile.pid).all()
+                if is_local_picture(profile.pfp) and (process_all or not profile.avatar_key)]
+    targets = [profile for profile in profiles if os.path.isfile(static_path(profile.pfp))]
+    for profile in profiles:
+        if profile not in targets:
+            print(f"Missing on disk, skipped: {profile.pfp}")
+    print(f"{len(targets)} profile pictures to process.")
+
+    output_root = static_path(AVATAR_DIRECTORY)
+    os.makedirs(output_root, exist_ok=True)
+    workers = workers or current_app.config["KEYWORD_WORKERS"]
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(profile, executor.submit(render_avatar, static_path(profile.pfp), output_root, profile.pid))
+                   for profile in targets]
+        for profile, future in futures:
+            try:
+                key = future.result()
+            except Exception as e:
+                print(f"Could not process {profile.pfp}: {e}")
+                failed += 1
+                continue
+            old_pfp, old_key = apply_avatar(profile, key)
+            refresh_profile_snapshot(profile.user_id)
+            try:
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error saving avatar for profile {profile.pid}, stopping: {e}")
+                raise SystemExit(1)
+            # The rendered copy replaces the original upload
+            remove_avatar_files(old_pfp, old_key if old_key != key else None)
+            done += 1
+    print(f"Avatars processed: {done}, failed: {failed}.")
+
+
+def init_app(app):
+    app.add_template_global(avatar_url)
+    app.add_template_global(avatar_srcset)
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_, select, update
+import click
+from . import db
+from .models import Publication, File
+from .pdf_text import extract_text
+from .keywords import extract_keywords_batch
+from .extraction_cache import get_cached_extraction, cached_keywords, store_extraction
+from .fast_keywords import document_terms, term_changes, apply_term_changes
+from .file_text import upload_path, stored_file_texts
+from .conditional import touch_profiles
+
+# Offline keyword extraction for publications that have an uploaded PDF but no keywords.
+# Text already stored for the file is used directly; other PDFs are read in a process
+# pool, keywords are extracted a batch at a time and written with one UPDATE per batch.
+# The last finished publication id is checkpointed so an interrupted run carries on
+# where it stopped.
+
+CHECKPOINT_FILE = "backfill_keywords.json"
+
+
+def read_pdf(path, max_pages, max_chars):
+    """Hash and read one PDF; runs in a pool process. Returns (sha256, text) or (None, error)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        text, _ = extract_text(data, max_pages=max_pages, max_chars=max_chars)
+        return hashlib.sha256(data).hexdigest(), text
+    except Exception as e:
+        return None, str(e)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get("last_pubid", 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def save_checkpoint(path, last_pubid):
+    with open(path, "w") as f:
+        json.dump({"last_pubid": last_pubid}, f)
+
+
+def pending_publications(after_pubid):
+    """Publications with a linked file and empty keywords, in id order"""
+    return (
+        db.session.query(Publication.pubid, Publication.abstract, File)
+        .join(File, Publication.fid == File.fid)
+        .filter(or_(Publication.keywords.is_(None), Publication.keywords == ""))
+        .filter(Publication.pubid > after_pubid)
+        .order_by(Publication.pubid)
+    )
+
+
+def format_keywords(keywords):
+    return ", ".join(keywords)[:500]
+
+
+@click.command("backfill-keywords")
+@click.option("--batch-size", default=16, show_default=True, help="Documents per keyword model call and per commit.")
+@click.option("--workers", type=int, default=None, help="PDF reader processes (default: KEYWORD_WORKERS).")
+@click.option("--limit", type=int, default=None, help="Stop after this many publications.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and rescan from the first publication.")
+@with_appcontext
+def backfill_keywords(batch_size, workers, limit, restart):
+    """Extract keywords for publications that have a PDF but no keywords."""
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    checkpoint = os.path.join(current_app.instance_path, CHECKPOINT_FILE)
+    after_pubid = 0 if restart else load_checkpoint(checkpoint)
+    if after_pubid:
+        print(f"Resuming after publication {after_pubid} (use --restart to rescan everything).")
+
+    query = pending_publications(after_pubid)
+    total = query.count()
+    if limit is not None:
+        total = min(total, limit)
+        query = query.limit(limit)
+    if total == 0:
+        print("No publications need keywords.")
+        return
+
+    # Materialise (pubid, fid, path) up front so the reading query isn't held open during commits
+    targets = []
+    skipped = 0
+    abstracts = {}
+    for pubid, abstract, file_record in query:
+        path = upload_path(file_record)
+        if path and os.path.exists(path):
+            targets.append((pubid, file_record.fid, path))
+            abstracts[pubid] = abstract
+        else:
+            skipped += 1
+
+    max_pages = current_app.config["KEYWORD_MAX_PAGES"]
+    max_chars = current_app.config["KEYWORD_MAX_CHARS"]
+    workers = workers or current_app.config["KEYWORD_WORKERS"]
+
+    done = failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(targets), batch_size):
+            batch = targets[start:start + batch_size]
+            stored = stored_file_texts([fid for _, fid, _ in batch])
+            unread = [path for _, fid, path in batch if fid not in stored]
+            read = iter(executor.map(read_pdf, unread, [max_pages] * len(unread), [max_chars] * len(unread)))
+            results = [(stored[fid][0], stored[fid][1][:max_chars]) if fid in stored else next(read)
+                       for _, fid, _ in batch]
+
+            rows = []
+            to_extract = []  # (pubid, sha256, text) still needing the model
+            for (pubid, _, path), (sha256, text) in zip(batch, results):
+                if sha256 is None:
+                    print(f"Could not read {path}: {text}")
+                    failed += 1
+                    continue
+                cached = get_cached_extraction(sha256)
+                if cached is not None:
+                    rows.append({"pubid": pubid, "keywords": format_keywords(cached_keywords(cached))})
+                elif text.strip():
+                    to_extract.append((pubid, sha256, text))
+                else:
+                    print(f"No readable text in {path}")
+                    failed += 1
+
+            keywords = extract_keywords_batch([text for _, _, text in to_extract])
+            for (pubid, sha256, text), words in zip(to_extract, keywords):
+                rows.append({"pubid": pubid, "keywords": format_keywords(words)})
+                store_extraction(current_app, sha256, text, words)
+
+            try:
+                if rows:
+                    now = datetime.utcnow()
+                    for row in rows:
+                        row["updated_at"] = now
+                    db.session.execute(update(Publication), rows)
+                    # Bulk updates skip the session hooks, so update the keyword statistics
+                    # and the owning profiles' modification times here
+                    touch_profiles(db.session.connection(),
+                                   select(Publication.pid).where(Publication.pubid.in_([row["pubid"] for row in rows])), now)
+                    changes = Counter()
+                    for row in rows:
+                        abstract = abstracts[row["pubid"]]
+                        changes.update(term_changes(document_terms(abstract, None), document_terms(abstract, row["keywords"])))
+                    apply_term_changes(db.session.connection(), {term: delta for term, delta in changes.items() if delta})
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error writing keywords, stopping: {e}")
+                raise SystemExit(1)
+            save_checkpoint(checkpoint, batch[-1][0])
+
+            done += len(rows)
+            processed = start + len(batch)
+            elapsed = time.perf_counter() - started
+            print(f"[{processed}/{len(targets)}] {done} updated, {failed} failed "
+                  f"({processed / elapsed:.1f} docs/s)")
+
+    # A complete pass leaves nothing to resume
+    if limit is None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    elapsed = time.perf_counter() - started
+    print(f"Keyword backfill finished: {done} updated, {failed} failed, {skipped} without a local PDF "
+          f"in {elapsed:.1f}s.")
@@ -0,0 +1,182 @@
+import hashlib
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db
+from .models import UploadSession
+from .storage import place_blob, sniff_type, StoredFile, SNIFF_BYTES
+from .extraction_cache import HASH_CHUNK_SIZE
+
+# Resumable uploads for large PDFs. The client starts an upload with the total size,
+# sends the bytes in chunks at the offset the server has acknowledged (after a dropped
+# connection it asks for the offset and carries on from there), then finishes it.
+# The paper forms submit the returned token instead of the file itself.
+#
+# Size and SHA-256 are computed while chunks are written. The running hash lives in
+# this process; if a chunk lands on another worker (or after a restart) the hash is
+# rebuilt once from the bytes already spooled.
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+_hashers = {}  # token -> (offset, hash object) for uploads this process has been writing
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """An upload request that can't be applied; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def spool_directory(app):
+    path = os.path.join(app.instance_path, "chunked_uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_path(app, token):
+    return os.path.join(spool_directory(app), f"{token}.part")
+
+
+def upload_as_dict(upload):
+    data = {"success": True, "token": upload.token, "offset": upload.received, "size": upload.size,
+            "status": upload.status, "chunk_size": current_app.config["UPLOAD_CHUNK_BYTES"]}
+    if upload.status == "complete":
+        data["sha256"] = upload.sha256
+    return data
+
+
+def start_upload(profile, file_name, size):
+    """Create an upload session and its empty spool file"""
+    max_bytes = current_app.config["UPLOAD_MAX_BYTES"]
+    if not file_name or not file_name.lower().endswith(".pdf"):
+        raise UploadError("Only PDF files are allowed")
+    if size <= 0:
+        raise UploadError("Upload size must be given")
+    if size > max_bytes:
+        raise UploadError(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit", 413)
+
+    purge_expired_uploads(current_app)
+
+    upload = UploadSession(token=uuid.uuid4().hex, pid=profile.pid, file_name=file_name[:255], size=size, received=0)
+    open(spool_path(current_app, upload.token), "wb").close()
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def _hasher_at(app, upload):
+    """Running hash of the first upload.received bytes"""
+    with _hashers_lock:
+        entry = _hashers.pop(upload.token, None)
+    if entry is not None and entry[0] == upload.received:
+        return entry[1]
+
+    digest = hashlib.sha256()
+    remaining = upload.received
+    with open(spool_path(app, upload.token), "rb") as f:
+        while remaining > 0:
+            data = f.read(min(HASH_CHUNK_SIZE, remaining))
+            if not data:
+                raise UploadError("Spooled upload is shorter than recorded", 409)
+            digest.update(data)
+            remaining -= len(data)
+    return digest
+
+
+def append_chunk(upload, offset, stream, length):
+    """Write one chunk from a request stream at offset, hashing it on the way to disk"""
+    if upload.status != "open":
+        raise UploadError("Upload is already complete", 409)
+    if offset != upload.received:
+        raise UploadError("Chunk does not start at the current offset", 409)
+    if length is None:
+        raise UploadError("Content-Length is required", 411)
+    if length > current_app.config["UPLOAD_CHUNK_BYTES"]:
+        raise UploadError("Chunk is too large", 413)
+    if upload.received + length > upload.size:
+        raise UploadError("Chunk goes past the announced size", 413)
+
+    app = current_app._get_current_object()
+    digest = _hasher_at(app, upload)
+    written = 0
+    with open(spool_path(app, upload.token), "r+b") as f:
+        # Drop anything an interrupted earlier request wrote past the acknowledged offset
+        f.seek(offset)
+        f.truncate()
+        while written < length:
+            data = stream.read(min(COPY_CHUNK_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            digest.update(data)
+            written += len(data)
+
+    if written != length:
+        # Client went away mid-chunk; the next attempt truncates back to the last offset
+        raise UploadError("Chunk was incomplete", 400)
+
+    upload.received += written
+    db.session.commit()
+    with _hashers_lock:
+        _hashers[upload.token] = (upload.received, digest)
+    return upload
+
+
+def finish_upload(upload):
+    """Check an upload received every byte and is a PDF, and record its hash"""
+    if upload.status == "complete":
+        return upload
+    if upload.received != upload.size:
+        raise UploadError("Upload is missing bytes", 409)
+
+    app = current_app._get_current_object()
+    with open(spool_path(app, upload.token), "rb") as f:
+        if sniff_type(f.read(SNIFF_BYTES))[1] != "pdf":
+            raise UploadError("File is not a PDF")
+
+    upload.sha256 = _hasher_at(app, upload).hexdigest()
+    upload.status = "complete"
+    db.session.commit()
+    return upload
+
+
+def claim_upload(token, profile):
+    """
+    Move a finished upload into blob storage for a paper form. Returns
+    (StoredFile, original name); the session row is removed with the caller's commit.
+    """
+    upload = db.session.get(UploadSession, token)
+    if upload is None or upload.pid != profile.pid:
+        raise UploadError("Upload not found", 404)
+    if upload.status != "complete":
+        raise UploadError("Upload is not finished", 409)
+
+    relative, size = place_blob(spool_path(current_app, token), upload.sha256)
+    db.session.delete(upload)
+    return StoredFile(relative, upload.sha256, size, "application/pdf", "pdf"), upload.file_name
+
+
+def discard_upload(app, upload):
+    with _hashers_lock:
+        _hashers.pop(upload.token, None)
+    try:
+        os.remove(spool_path(app, upload.token))
+    except FileNotFoundError:
+        pass
+    db.session.delete(upload)
+
+
+def purge_expired_uploads(app):
+    """Remove uploads nobody has touched within UPLOAD_SESSION_TTL, and their spooled bytes"""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config["UPLOAD_SESSION_TTL"])
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        discard_upload(app, upload)
+    if expired:
+        db.session.commit()
+    return len(expired)
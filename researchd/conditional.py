@@ -0,0 +1,150 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+from . import db
+from .models import (User, Profile, ProfileSnapshot, ProfileInterest, Education, Experience, Achievement,
+                     ExternalRole, File, FileText, Photo, Social, Publication)
+
+# Rows shown on a researcher's pages. Writing any of them bumps the owning profile's
+# updated_at, so one timestamp lookup tells whether the profile or papers page changed.
+PROFILE_CHILD_MODELS = (ProfileInterest, Education, Experience, Achievement, ExternalRole, File, Photo, Social, Publication)
+
+
+def touch_profiles(connection, pids, now=None):
+    """Bump updated_at on the given profiles (pids may be a list or a select of pids)"""
+    table = Profile.__table__
+    connection.execute(update(table).where(table.c.pid.in_(pids)).values(updated_at=now or datetime.utcnow()))
+
+
+def collect_touched_profiles(session):
+    """Profile ids and user ids whose pages change with this flush"""
+    pids = set()
+    user_ids = set()
+    for obj in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(obj, PROFILE_CHILD_MODELS):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            if obj.pid is not None:
+                pids.add(obj.pid)
+        elif isinstance(obj, User) and obj in session.dirty and session.is_modified(obj):
+            user_ids.add(obj.id)
+    return pids, user_ids
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_touched_profiles(session, flush_context, instances):
+    # Deleted rows still know their pid here, not after the DELETE
+    pids, user_ids = collect_touched_profiles(session)
+    if pids or user_ids:
+        session.info.setdefault("touched_pids", set()).update(pids)
+        session.info.setdefault("touched_user_ids", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _touch_profiles(session, flush_context):
+    pids = session.info.pop("touched_pids", None)
+    user_ids = session.info.pop("touched_user_ids", None)
+    connection = session.connection()
+    if pids:
+        touch_profiles(connection, pids)
+    if user_ids:
+        touch_profiles(connection, select(Profile.pid).where(Profile.user_id.in_(user_ids)))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_touched_profiles(session):
+    session.info.pop("touched_pids", None)
+    session.info.pop("touched_user_ids", None)
+
+
+def profile_last_modified(researcher_id):
+    """When anything on a researcher's profile or papers page last changed, or None for an unknown user"""
+    row = db.session.execute(
+        select(User.created_at, Profile.updated_at, ProfileSnapshot.built_at)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .outerjoin(ProfileSnapshot, ProfileSnapshot.user_id == User.id)
+        .where(User.id == researcher_id)
+    ).first()
+    if row is None:
+        return None
+    return max((value for value in row if value is not None), default=None)
+
+
+def paper_last_modified(paper_id):
+    """When a paper, its file (e.g. marked missing) or the page text its in-paper search reads last changed"""
+    row = db.session.execute(
+        select(Publication.updated_at, File.updated_at, FileText.extracted_at)
+        .outerjoin(File, File.fid == Publication.fid)
+        .outerjoin(FileText, FileText.fid == Publication.fid)
+        .where(Publication.pubid == paper_id)
+    ).first()
+    if row is None:
+        return None
+    return max((value for value in row if value is not None), default=None)
+
+
+def page_etag(last_modified):
+    """
+    Strong validator for one rendering of a page. The navbar and CSRF token differ per
+    viewer, so the viewer, their session's CSRF secret and the token's validity window
+    are part of the tag; a 304 never hands back a page with an expired token.
+    """
+    parts = [request.full_path, last_modified.isoformat()]
+    parts.append(str(current_user.get_id()) if current_user.is_authenticated else "anonymous")
+    if current_app.config.get("WTF_CSRF_ENABLED", True):
+        parts.append(str(session.get("csrf_token", "")))
+        time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+        if time_limit:
+            parts.append(str(int(time.time() // time_limit)))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+def is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    # Last-Modified doesn't identify the viewer, so only anonymous requests may rely on it
+    if request.if_modified_since and not current_user.is_authenticated:
+        return request.if_modified_since >= last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    return False
+
+
+def conditional(last_modified_for):
+    """
+    Answer GET/HEAD with 304 Not Modified when the client's copy is current, without
+    running the view. last_modified_for receives the view's URL arguments and returns
+    the page's modification time (None lets the view handle it, e.g. with a 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # A pending flash message belongs in the next rendered page
+            if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+                return view(*args, **kwargs)
+
+            last_modified = last_modified_for(**kwargs)
+            if last_modified is None:
+                return view(*args, **kwargs)
+
+            etag = page_etag(last_modified)
+            if is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Rendering may have just created the session's CSRF secret
+                etag = page_etag(last_modified)
+
+            response.set_etag(etag)
+            response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add("Cookie")
+            return response
+        return wrapper
+    return decorator
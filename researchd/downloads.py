@@ -0,0 +1,61 @@
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
+from flask import current_app, send_file
+from .file_text import upload_path
+
+# How uploaded files reach the client (FILE_SERVING):
+#   "stream"           - this process streams the file in chunks, answering Range requests
+#                        with 206 Partial Content so PDF viewers can fetch pages on demand
+#   "x-sendfile"       - an X-Sendfile header hands the path to Apache/lighttpd
+#   "x-accel-redirect" - an X-Accel-Redirect header hands FILE_ACCEL_REDIRECT_PREFIX + path
+#                        to an nginx `internal` location
+# Either way the view still does the access check; only the bytes are offloaded.
+SERVING_MODES = ("stream", "x-sendfile", "x-accel-redirect")
+
+
+def upload_mimetype(file_record):
+    mime_type, _ = mimetypes.guess_type(file_record.file_path)
+    return mime_type or "application/pdf"
+
+
+def download_name(file_record):
+    return file_record.file_name or os.path.basename(file_record.file_path)
+
+
+def content_disposition(disposition, filename):
+    """
+    Content-Disposition value built like send_file does: a plain ASCII `filename=` fallback
+    (quotes, backslashes and control characters replaced) plus the exact name as RFC 5987
+    `filename*=` whenever the fallback differs from it.
+    """
+    fallback = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+    fallback = "".join("_" if c in '"\\' or not c.isprintable() else c for c in fallback) or "download"
+    value = f'{disposition}; filename="{fallback}"'
+    if fallback != filename:
+        value += f"; filename*=UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}"
+    return value
+
+
+def send_upload(file_record, as_attachment=False):
+    """
+    Response serving an uploaded file, or None when it is missing on disk.
+    Used by both the owner-only and the public download routes.
+    """
+    path = upload_path(file_record)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    mimetype = upload_mimetype(file_record)
+    name = download_name(file_record)
+
+    if current_app.config["FILE_SERVING"] == "x-accel-redirect":
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = current_app.config["FILE_ACCEL_REDIRECT_PREFIX"] + quote(file_record.file_path)
+        response.headers["Content-Disposition"] = content_disposition("attachment" if as_attachment else "inline", name)
+        return response
+
+    # send_file streams from the open file, honours Range/If-Range and sets an ETag;
+    # with USE_X_SENDFILE on (FILE_SERVING="x-sendfile") it only sends the header
+    return send_file(path, mimetype=mimetype, as_attachment=as_attachment, download_name=name, conditional=True)
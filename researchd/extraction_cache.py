@@ -0,0 +1,74 @@
+import hashlib
+import json
+import zlib
+from datetime import datetime
+from . import db
+from .models import ExtractionCache
+
+# Extraction results keyed by the SHA-256 of the PDF bytes.
+# Entries are evicted least-recently-used first once the configured entry count
+# or total stored size is exceeded.
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_storage):
+    """Hash an uploaded file's stream in chunks, leaving it rewound for saving"""
+    digest = hashlib.sha256()
+    stream = file_storage.stream
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def get_cached_extraction(sha256):
+    """Return the cache entry for a PDF hash (marking it recently used), or None"""
+    entry = db.session.get(ExtractionCache, sha256)
+    if entry is None:
+        return None
+    entry.hits += 1
+    entry.last_used_at = datetime.utcnow()
+    db.session.commit()
+    return entry
+
+
+def cached_keywords(entry):
+    return json.loads(entry.keywords or "[]")
+
+
+def cached_text(entry):
+    return zlib.decompress(entry.text).decode("utf-8") if entry.text else ""
+
+
+def store_extraction(app, sha256, text, keywords):
+    """Insert or replace a cache entry, then evict down to the configured limits"""
+    compressed = zlib.compress(text.encode("utf-8"), 6)
+    entry = db.session.get(ExtractionCache, sha256) or ExtractionCache(sha256=sha256)
+    entry.text = compressed
+    entry.keywords = json.dumps(keywords)
+    entry.size_bytes = len(compressed) + len(entry.keywords)
+    entry.last_used_at = datetime.utcnow()
+    db.session.add(entry)
+    db.session.flush()
+    evict_extractions(app.config["EXTRACTION_CACHE_MAX_ENTRIES"], app.config["EXTRACTION_CACHE_MAX_BYTES"])
+
+
+def evict_extractions(max_entries, max_bytes):
+    """Delete least-recently-used entries until both limits hold"""
+    count, total = db.session.query(db.func.count(ExtractionCache.sha256), db.func.coalesce(db.func.sum(ExtractionCache.size_bytes), 0)).one()
+    if count <= max_entries and total <= max_bytes:
+        return 0
+
+    oldest = db.session.query(ExtractionCache.sha256, ExtractionCache.size_bytes).order_by(ExtractionCache.last_used_at.asc()).yield_per(100)
+    doomed = []
+    for sha256, size in oldest:
+        if count <= max_entries and total <= max_bytes:
+            break
+        doomed.append(sha256)
+        count -= 1
+        total -= size
+    if not doomed:
+        return 0
+    return ExtractionCache.query.filter(ExtractionCache.sha256.in_(doomed)).delete(synchronize_session=False)
@@ -0,0 +1,172 @@
+from collections import Counter
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, inspect, select, delete, update, insert
+from sqlalchemy.orm import Session
+import click
+from . import db
+from .models import Profile, Publication, FacetCount, Interest, ProfileInterest
+
+# Facet name -> (model, attribute) it is counted from.
+# Counts are kept current by the session hooks below, so /search only reads the top rows.
+FACET_SOURCES = {
+    "institution": (Profile, "institution"),
+    "position": (Profile, "position"),
+    "interest": (Profile, "interest_links"),
+    "journal": (Publication, "journal"),
+    "year": (Publication, "year"),
+}
+
+RESEARCHER_FACETS = ("institution", "position", "interest")
+PAPER_FACETS = ("journal", "year")
+
+MAX_VALUE_LENGTH = 300
+
+
+def facet_values(facet, raw):
+    """Values a single attribute value (or collection member) contributes to a facet"""
+    if facet == "interest":
+        values = [raw.interest.name]
+    elif raw is None or str(raw).strip() == "":
+        values = []
+    else:
+        values = [str(raw).strip()]
+    return [value[:MAX_VALUE_LENGTH] for value in values]
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history loads the previous value on assignment, so the old count can be
+# decremented even when the attribute was expired by an earlier commit
+for _model, _attribute in FACET_SOURCES.values():
+    event.listen(getattr(_model, _attribute), "set", _load_previous_value, active_history=True)
+
+
+def collect_facet_changes(session):
+    """Work out +/- count changes for every pending insert, update and delete"""
+    changes = Counter()
+
+    def apply(facet, raw, delta):
+        for value in facet_values(facet, raw):
+            changes[(facet, value)] += delta
+
+    for obj in session.new:
+        for facet, (model, attribute) in FACET_SOURCES.items():
+            if isinstance(obj, model):
+                history = inspect(obj).attrs[attribute].history
+                for new in [*history.added, *history.unchanged]:
+                    apply(facet, new, 1)
+
+    for obj in session.deleted:
+        for facet, (model, attribute) in FACET_SOURCES.items():
+            if isinstance(obj, model):
+                getattr(obj, attribute)  # make sure the attribute is loaded
+                history = inspect(obj).attrs[attribute].history
+                for old in [*history.deleted, *history.unchanged]:
+                    apply(facet, old, -1)
+
+    for obj in session.dirty:
+        if obj in session.deleted:
+            continue
+        for facet, (model, attribute) in FACET_SOURCES.items():
+            if isinstance(obj, model):
+                history = inspect(obj).attrs[attribute].history
+                if not history.has_changes():
+                    continue
+                for old in history.deleted:
+                    apply(facet, old, -1)
+                for new in history.added:
+                    apply(facet, new, 1)
+
+    return {key: delta for key, delta in changes.items() if delta}
+
+
+def apply_facet_changes(connection, changes):
+    """Add the count deltas to facet_counts and drop values that reach zero"""
+    table = FacetCount.__table__
+    for (facet, value), delta in changes.items():
+        key = (table.c.facet == facet) & (table.c.value == value)
+        result = connection.execute(update(table).where(key).values(count=table.c.count + delta))
+        if result.rowcount == 0 and delta > 0:
+            connection.execute(insert(table).values(facet=facet, value=value, count=delta))
+        elif delta < 0:
+            connection.execute(delete(table).where(key, table.c.count <= 0))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_facet_changes(session, flush_context, instances):
+    # Old values of deleted rows must be read before the DELETE is issued
+    changes = collect_facet_changes(session)
+    if changes:
+        pending = session.info.setdefault("facet_changes", Counter())
+        pending.update(changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_facet_changes(session, flush_context):
+    changes = session.info.pop("facet_changes", None)
+    if changes:
+        apply_facet_changes(session.connection(), changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_facet_changes(session):
+    session.info.pop("facet_changes", None)
+
+
+def top_facet_values(facet, limit, selected=None):
+    """
+    Return up to `limit` (value, count) pairs for a facet, most common first.
+    A selected value outside the top rows is still included so the dropdown can show it.
+    """
+    rows = db.session.execute(
+        select(FacetCount.value, FacetCount.count)
+        .where(FacetCount.facet == facet)
+        .order_by(FacetCount.count.desc(), FacetCount.value.asc())
+        .limit(limit)
+    ).all()
+    values = [(row.value, row.count) for row in rows]
+
+    if selected and selected not in [value for value, _ in values]:
+        row = db.session.get(FacetCount, (facet, selected))
+        values.append((selected, row.count if row else 0))
+
+    if facet == "year":
+        values.sort(key=lambda item: int(item[0]), reverse=True)
+    return values
+
+
+def rebuild_facets(connection):
+    """Recount every facet from the source tables"""
+    changes = Counter()
+    for facet, (model, attribute) in FACET_SOURCES.items():
+        if facet == "interest":
+            rows = connection.execute(
+                select(Interest.name, func.count()).join(ProfileInterest, ProfileInterest.iid == Interest.iid).group_by(Interest.name)
+            )
+            for name, count in rows:
+                changes[(facet, name[:MAX_VALUE_LENGTH])] += count
+        else:
+            column = getattr(model, attribute)
+            rows = connection.execute(select(column, func.count()).where(column.isnot(None)).group_by(column))
+            for raw, count in rows:
+                for value in facet_values(facet, raw):
+                    changes[(facet, value)] += count
+
+    connection.execute(delete(FacetCount.__table__))
+    if changes:
+        connection.execute(
+            insert(FacetCount.__table__),
+            [{"facet": facet, "value": value, "count": count} for (facet, value), count in changes.items()],
+        )
+    return len(changes)
+
+
+@click.command("rebuild-facets")
+@with_appcontext
+def rebuild_facets_command():
+    """Recompute the search filter facet counts from scratch."""
+    with db.engine.begin() as connection:
+        count = rebuild_facets(connection)
+    print(f"Facet counts rebuilt: {count} values.")
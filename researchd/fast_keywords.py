@@ -0,0 +1,235 @@
+import math
+import re
+from collections import Counter
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select, delete, update, insert
+from sqlalchemy.orm import Session
+import click
+from . import db
+from .models import Publication, KeywordTerm
+
+# Lightweight keyword extractor that needs no model: candidate phrases are split
+# RAKE-style at stopwords and punctuation, then scored by TF-IDF with document
+# frequencies taken from publication abstracts and keywords. The frequencies live in
+# keyword_terms and are kept current by the session hooks below, like facet counts.
+
+DOCUMENT_COUNT_TERM = "*"
+MAX_TERM_LENGTH = 100
+MAX_PHRASE_WORDS = 2  # same n-gram range as the KeyBERT extractor
+
+STOPWORDS = frozenset("""
+a about above across after again against all almost along also although always am among an and
+another any anyone are around as at be because been before being below between both but by can
+cannot could did do does doing done down during each either else etc even ever every few for from
+further had has have having he her here hers herself him himself his how however i if in into is
+it its itself just least less many may me might more most much must my myself neither no nor not
+now of off often on once one only or other others otherwise our ours ourselves out over own per
+perhaps rather same several she should since so some such than that the their theirs them
+themselves then there therefore these they this those though through thus to too toward towards
+under until up upon us use used using very via was we well were what whatever when where whereas
+whether which while who whom whose why will with within without would yet you your yours
+yourself yourselves et al fig figure table paper study result results show shows shown based
+new two three first second also however found
+""".split())
+
+WORD_RE = re.compile(r"[a-z][a-z0-9\-]*[a-z0-9]")
+SPLIT_RE = re.compile(r"[^a-z0-9\-\s]+")
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower()) if text else []
+
+
+def is_content_word(word):
+    return len(word) >= 3 and not word.isdigit() and word not in STOPWORDS
+
+
+def document_terms(abstract, keywords):
+    """Distinct content words a publication contributes to the document frequencies"""
+    words = tokenize(abstract) + tokenize(keywords)
+    return {word[:MAX_TERM_LENGTH] for word in words if is_content_word(word)}
+
+
+def candidate_phrases(text):
+    """Split text into runs of content words, broken at punctuation and stopwords"""
+    phrases = []
+    for fragment in SPLIT_RE.split(text.lower()):
+        run = []
+        for word in WORD_RE.findall(fragment):
+            if is_content_word(word):
+                run.append(word)
+            else:
+                if run:
+                    phrases.append(run)
+                run = []
+        if run:
+            phrases.append(run)
+
+    # Long runs contribute their n-grams up to MAX_PHRASE_WORDS
+    candidates = []
+    for run in phrases:
+        for size in range(1, MAX_PHRASE_WORDS + 1):
+            for i in range(len(run) - size + 1):
+                candidates.append(tuple(run[i:i + size]))
+    return candidates
+
+
+def document_frequencies(terms):
+    """Return (document count, {term: doc_count}) for the given terms"""
+    terms = [term[:MAX_TERM_LENGTH] for term in terms]
+    rows = db.session.execute(
+        select(KeywordTerm.term, KeywordTerm.doc_count).where(KeywordTerm.term.in_([DOCUMENT_COUNT_TERM, *terms]))
+    ).all()
+    counts = dict(rows)
+    return counts.pop(DOCUMENT_COUNT_TERM, 0), counts
+
+
+def extract_keywords_fast(text, top_n=8):
+    """Top TF-IDF scored phrases of a document, best first"""
+    candidates = candidate_phrases(text)
+    if not candidates:
+        return []
+
+    word_counts = Counter(word for phrase in candidates if len(phrase) == 1 for word in phrase)
+    documents, frequencies = document_frequencies(word_counts)
+    longest = max(word_counts.values())
+
+    def weight(word):
+        tf = 0.5 + 0.5 * word_counts[word] / longest
+        idf = math.log((documents + 1) / (frequencies.get(word, 0) + 1)) + 1
+        return tf * idf
+
+    phrase_counts = Counter(candidates)
+    scores = {}
+    for phrase, count in phrase_counts.items():
+        # A bigram must recur to beat its own words; one-off pairs are usually noise
+        if len(phrase) > 1 and count < 2:
+            continue
+        scores[phrase] = sum(weight(word) for word in phrase) * (1 + math.log(count))
+
+    keywords = []
+    chosen_words = set()
+    for phrase, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+        # Skip words already covered by a better-scoring phrase
+        if set(phrase) <= chosen_words:
+            continue
+        keywords.append(" ".join(phrase))
+        chosen_words.update(phrase)
+        if len(keywords) >= top_n:
+            break
+    return keywords
+
+
+def term_changes(old_terms, new_terms):
+    """Document-frequency deltas for one publication going from old_terms to new_terms"""
+    changes = Counter()
+    for term in new_terms - old_terms:
+        changes[term] += 1
+    for term in old_terms - new_terms:
+        changes[term] -= 1
+    if new_terms and not old_terms:
+        changes[DOCUMENT_COUNT_TERM] += 1
+    elif old_terms and not new_terms:
+        changes[DOCUMENT_COUNT_TERM] -= 1
+    return changes
+
+
+def _attribute_values(obj, attribute):
+    """(old, new) value of an attribute from its pending history"""
+    getattr(obj, attribute)  # make sure the attribute is loaded (it may be expired on a deleted row)
+    history = inspect(obj).attrs[attribute].history
+    if history.unchanged:
+        return history.unchanged[0], history.unchanged[0]
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load previous values on assignment so the old terms can be decremented
+for _attribute in (Publication.abstract, Publication.keywords):
+    event.listen(_attribute, "set", _load_previous_value, active_history=True)
+
+
+def collect_term_changes(session):
+    changes = Counter()
+    for obj in session.new:
+        if isinstance(obj, Publication):
+            changes.update(term_changes(set(), document_terms(obj.abstract, obj.keywords)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Publication):
+            abstract, _ = _attribute_values(obj, "abstract")
+            keywords, _ = _attribute_values(obj, "keywords")
+            changes.update(term_changes(document_terms(abstract, keywords), set()))
+
+    for obj in session.dirty:
+        if obj in session.deleted or not isinstance(obj, Publication):
+            continue
+        old_abstract, new_abstract = _attribute_values(obj, "abstract")
+        old_keywords, new_keywords = _attribute_values(obj, "keywords")
+        if old_abstract == new_abstract and old_keywords == new_keywords:
+            continue
+        changes.update(term_changes(document_terms(old_abstract, old_keywords), document_terms(new_abstract, new_keywords)))
+
+    return {term: delta for term, delta in changes.items() if delta}
+
+
+def apply_term_changes(connection, changes):
+    """Add document-frequency deltas to keyword_terms, dropping terms that reach zero"""
+    table = KeywordTerm.__table__
+    for term, delta in changes.items():
+        key = table.c.term == term
+        result = connection.execute(update(table).where(key).values(doc_count=table.c.doc_count + delta))
+        if result.rowcount == 0 and delta > 0:
+            connection.execute(insert(table).values(term=term, doc_count=delta))
+        elif delta < 0:
+            connection.execute(delete(table).where(key, table.c.doc_count <= 0))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_term_changes(session, flush_context, instances):
+    changes = collect_term_changes(session)
+    if changes:
+        pending = session.info.setdefault("keyword_term_changes", Counter())
+        pending.update(changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_term_changes(session, flush_context):
+    changes = session.info.pop("keyword_term_changes", None)
+    if changes:
+        apply_term_changes(session.connection(), changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_term_changes(session):
+    session.info.pop("keyword_term_changes", None)
+
+
+def rebuild_keyword_stats(connection):
+    """Recount document frequencies from every publication"""
+    changes = Counter()
+    rows = connection.execute(select(Publication.abstract, Publication.keywords))
+    for abstract, keywords in rows:
+        changes.update(term_changes(set(), document_terms(abstract, keywords)))
+
+    connection.execute(delete(KeywordTerm.__table__))
+    if changes:
+        connection.execute(
+            insert(KeywordTerm.__table__),
+            [{"term": term, "doc_count": count} for term, count in changes.items()],
+        )
+    return changes.get(DOCUMENT_COUNT_TERM, 0)
+
+
+@click.command("rebuild-keyword-stats")
+@with_appcontext
+def rebuild_keyword_stats_command():
+    """Recompute the fast keyword extractor's document frequencies."""
+    with db.engine.begin() as connection:
+        documents = rebuild_keyword_stats(connection)
+    print(f"Keyword statistics rebuilt from {documents} publications.")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from flask import current_app
+from flask.cli import with_appcontext
+import click
+from . import db
+from .models import File, FileText
+from .pdf_text import extract_pages, split_pages, PAGE_SEPARATOR
+from .search_index import write_file_pages, delete_file_pages
+from .jobs import get_executor
+
+# Text of every uploaded PDF, extracted once in the background after upload and stored
+# compressed per file (pages separated by PAGE_SEPARATOR), so search, keyword backfills
+# and similarity features never have to reopen the PDF. Storing a file's text also
+# refreshes its rows in the page search index.
+
+
+def upload_path(file_record):
+    """Local path of an uploaded file, or None for external URLs"""
+    if "://" in file_record.file_path:
+        return None
+    return os.path.join(current_app.root_path, "static", "uploads", file_record.file_path)
+
+
+def extract_file_text(data, sha256, max_pages, max_chars):
+    """Read the text of PDF bytes already in memory; runs in a pool process. Returns a dict for store_file_text"""
+    try:
+        pages, stats = extract_pages(data, max_pages=max_pages, max_chars=max_chars)
+        return {"sha256": sha256, "text": PAGE_SEPARATOR.join(pages), "page_count": stats.page_count}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def read_file_text(path, max_pages, max_chars):
+    """Hash and read one PDF from disk; runs in a pool process. Returns a dict for store_file_text"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except Exception as e:
+        return {"error": str(e)}
+    return extract_file_text(data, hashlib.sha256(data).hexdigest(), max_pages, max_chars)
+
+
+def store_file_text(fid, result):
+    """Insert or replace the stored text (and page index rows) for a file from a read_file_text result"""
+    record = db.session.get(FileText, fid) or FileText(fid=fid)
+    record.extracted_at = datetime.utcnow()
+    if "error" in result:
+        record.status = "failed"
+        record.error = result["error"][:500]
+        record.text = None
+        record.char_count = 0
+        delete_file_pages(db.session.connection(), fid)
+    else:
+        text = result["text"]
+        record.status = "done" if text.strip() else "empty"
+        record.error = None
+        record.text = zlib.compress(text.encode("utf-8"), 6)
+        record.sha256 = result["sha256"]
+        record.page_count = result["page_count"]
+        record.char_count = len(text)
+        write_file_pages(db.session.connection(), fid, split_pages(text))
+    db.session.add(record)
+    return record
+
+
+def get_file_text(fid):
+    """Stored text of a file, or None if it hasn't been extracted (or had no text)"""
+    record = db.session.get(FileText, fid)
+    if record is None or record.status != "done":
+        return None
+    return zlib.decompress(record.text).decode("utf-8")
+
+
+def stored_file_texts(fids):
+    """{fid: (sha256, text)} for the given files that have stored text"""
+    if not fids:
+        return {}
+    records = FileText.query.filter(FileText.fid.in_(fids), FileText.status == "done").all()
+    return {record.fid: (record.sha256, zlib.decompress(record.text).decode("utf-8")) for record in records}
+
+
+def queue_file_text(app, file_record, data=None):
+    """
+    Extract a just-uploaded file's text on the background process pool. Passing the
+    bytes the upload was ingested from skips reading the stored file back from disk.
+    """
+    fid = file_record.fid
+    max_pages, max_chars = app.config["FILE_TEXT_MAX_PAGES"], app.config["FILE_TEXT_MAX_CHARS"]
+    if data is not None:
+        future = get_executor(app).submit(extract_file_text, data, file_record.sha256, max_pages, max_chars)
+    else:
+        path = upload_path(file_record)
+        if not path or not os.path.exists(path):
+            return None
+        future = get_executor(app).submit(read_file_text, path, max_pages, max_chars)
+    future.add_done_callback(lambda f: _finish(app, fid, f))
+    return future
+
+
+def _finish(app, fid, future):
+    """Store a background extraction; runs on the executor's callback thread"""
+    with app.app_context():
+        try:
+            # The file may have been replaced or deleted while its text was being read
+            if db.session.get(File, fid) is not None:
+                store_file_text(fid, future.result())
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error storing extracted text for file {fid}: {e}")
+        finally:
+            db.session.remove()
+
+
+@click.command("rebuild-file-text")
+@click.option("--all", "rebuild_all", is_flag=True, help="Re-extract files that already have stored text.")
+@click.option("--workers", type=int, default=None, help="PDF reader processes (default: KEYWORD_WORKERS).")
+@click.option("--batch-size", default=50, show_default=True, help="Files per commit.")
+@with_appcontext
+def rebuild_file_text(rebuild_all, workers, batch_size):
+    """Extract and store the text of uploaded PDFs that don't have it yet."""
+    query = File.query.order_by(File.fid)
+    if not rebuild_all:
+        query = query.outerjoin(FileText, FileText.fid == File.fid).filter(FileText.fid.is_(None))
+
+    targets = []
+    skipped = 0
+    for file_record in query:
+        path = upload_path(file_record)
+        if path and os.path.exists(path):
+            targets.append((file_record.fid, path))
+        else:
+            skipped += 1
+    if not targets:
+        print(f"No files need text extraction ({skipped} without a local PDF).")
+        return
+
+    max_pages = current_app.config["FILE_TEXT_MAX_PAGES"]
+    max_chars = current_app.config["FILE_TEXT_MAX_CHARS"]
+    workers = workers or current_app.config["KEYWORD_WORKERS"]
+
+    stored = failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(targets), batch_size):
+            batch = targets[start:start + batch_size]
+            results = executor.map(read_file_text, [path for _, path in batch],
+                                   [max_pages] * len(batch), [max_chars] * len(batch))
+            for (fid, path), result in zip(batch, results):
+                record = store_file_text(fid, result)
+                if record.status == "failed":
+                    print(f"Could not read {path}: {record.error}")
+                    failed += 1
+                else:
+                    stored += 1
+            try:
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error storing file text, stopping: {e}")
+                raise SystemExit(1)
+            print(f"[{start + len(batch)}/{len(targets)}] stored")
+
+    elapsed = time.perf_counter() - started
+    print(f"File text rebuilt: {stored} stored, {failed} failed, {skipped} without a local PDF in {elapsed:.1f}s.")
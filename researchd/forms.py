@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
-from wtforms import StringField, PasswordField, SubmitField, TextAreaField, URLField, DateField, IntegerField, SelectField
+from wtforms import StringField, PasswordField, SubmitField, TextAreaField, URLField, DateField, IntegerField, SelectField, HiddenField
 from wtforms.validators import InputRequired, Length, Email, EqualTo, Optional, NumberRange, DataRequired, ValidationError
 import re
 
@@ -165,6 +165,12 @@ class AchievementForm(FlaskForm):
     year = IntegerField("Year")
     description = TextAreaField("Description")
 
+def require_paper_file(form, field):
+    """A new paper needs either a PDF in the form or a finished resumable upload"""
+    if not field.data and not form.upload_token.data:
+        raise ValidationError("Please choose a PDF to upload")
+
+
 class UploadPaperForm(FlaskForm):
     title = StringField("Paper Title", validators=[InputRequired(), Length(min=1, max=300)])
     authors = TextAreaField("Authors", validators=[InputRequired(), Length(min=1, max=1000)], 
@@ -181,8 +187,10 @@ class UploadPaperForm(FlaskForm):
     keywords = StringField("Keywords", validators=[Optional(), Length(max=500)], 
                           render_kw={"placeholder": "Enter keywords separated by commas"})
     paper_file = FileField("Upload Paper (PDF)", validators=[
-        InputRequired(), FileAllowed(['pdf'], 'Only PDF files are allowed!')
+        require_paper_file, FileAllowed(['pdf'], 'Only PDF files are allowed!')
     ])
+    # Token of a finished chunked upload, sent by upload_paper.js in place of the file
+    upload_token = HiddenField()
     submit = SubmitField("Upload Paper")
 
 class EditPaperForm(FlaskForm):
@@ -203,4 +211,5 @@ class EditPaperForm(FlaskForm):
     paper_file = FileField("Update Paper (PDF)", validators=[
         Optional(), FileAllowed(['pdf'], 'Only PDF files are allowed!')
     ])
+    upload_token = HiddenField()
     submit = SubmitField("Update Paper")
\ No newline at end of file
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import update, func
+import click
+from . import db
+from .models import ExtractionJob
+from .keywords import extract_keywords_from_pdf, metrics, preload
+from .extraction_cache import store_extraction
+
+# Keyword extraction runs in a bounded process pool so PDF parsing and model
+# inference never hold a web worker. Job rows live in the database, so results
+# (and unfinished jobs) survive a worker restart.
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = {}  # job_id -> Future for jobs submitted by this process
+
+
+class QueueFullError(Exception):
+    """Raised when too many extraction jobs are already waiting"""
+
+
+def get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # With KEYBERT_PRELOAD each pool process loads the model as it starts
+            initializer = preload if app.config["KEYBERT_PRELOAD"] else None
+            _executor = ProcessPoolExecutor(max_workers=app.config["KEYWORD_WORKERS"], initializer=initializer)
+        return _executor
+
+
+def job_directory(app):
+    path = os.path.join(app.instance_path, "extraction_jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def active_job_count(app):
+    """Jobs still waiting or running, ignoring ones abandoned longer than the job timeout"""
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config["KEYWORD_JOB_TIMEOUT"])
+    return ExtractionJob.query.filter(
+        ExtractionJob.status.in_(ACTIVE_STATUSES),
+        ExtractionJob.created_at >= cutoff,
+    ).count()
+
+
+def submit_extraction_job(app, profile, pdf_file, sha256=None):
+    """Persist the uploaded PDF and a job row, then hand the job to the process pool"""
+    # Submitting is a write request anyway, so abandoned jobs are picked up here
+    recover_stale_jobs(app)
+    if active_job_count(app) >= app.config["KEYWORD_JOB_QUEUE_LIMIT"]:
+        raise QueueFullError("Keyword extraction queue is full")
+
+    job_id = uuid.uuid4().hex
+    file_path = os.path.join(job_directory(app), f"{job_id}.pdf")
+    pdf_file.save(file_path)
+
+    job = ExtractionJob(job_id=job_id, pid=profile.pid, status="queued", file_path=file_path, sha256=sha256)
+    db.session.add(job)
+    db.session.commit()
+
+    _dispatch(app, job)
+    return job
+
+
+def claim_job(job, values):
+    """
+    Apply values to a job only if its status and attempts are still what this process
+    read, so two workers (or a stale replica read) can't both act on it. Returns whether
+    the update won.
+    """
+    result = db.session.execute(
+        update(ExtractionJob)
+        .where(ExtractionJob.job_id == job.job_id, ExtractionJob.status == job.status, ExtractionJob.attempts == job.attempts)
+        .values(**values)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _dispatch(app, job):
+    attempt = job.attempts + 1
+    if not claim_job(job, {"status": "running", "attempts": attempt, "started_at": datetime.utcnow()}):
+        return False
+    db.session.refresh(job)
+
+    future = get_executor(app).submit(
+        extract_keywords_from_pdf,
+        job.file_path,
+        max_pages=app.config["KEYWORD_MAX_PAGES"],
+        max_chars=app.config["KEYWORD_MAX_CHARS"],
+    )
+    _futures[job.job_id] = future
+    job_id = job.job_id
+    future.add_done_callback(lambda f: _finish(app, job_id, attempt, f))
+    return True
+
+
+def _finish(app, job_id, attempt, future):
+    """Record a finished job's result; runs on the executor's callback thread"""
+    _futures.pop(job_id, None)
+    with app.app_context():
+        job = db.session.get(ExtractionJob, job_id)
+        # A newer attempt (re-dispatched after a timeout) owns the job and its file now
+        if job is None or job.attempts != attempt or job.status != "running":
+            db.session.remove()
+            return
+        try:
+            result = future.result()
+            metrics.record_timings(result["timings"])
+            job.keywords = json.dumps(result["keywords"])
+            job.pages_processed = result["stats"]["pages_processed"]
+            job.chars_processed = result["stats"]["chars_processed"]
+            job.status = "done"
+            if job.sha256:
+                store_extraction(app, job.sha256, result["text"], result["keywords"])
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)[:500]
+        job.finished_at = datetime.utcnow()
+
+        if job.file_path and os.path.exists(job.file_path):
+            try:
+                os.remove(job.file_path)
+            except OSError as e:
+                print(f"Error removing extraction job file: {e}")
+        job.file_path = None
+        db.session.commit()
+        db.session.remove()
+
+
+def recover_stale_jobs(app):
+    """
+    Re-dispatch (or fail, once out of attempts) jobs that have been queued or running longer
+    than the job timeout, e.g. after a worker restart. Jobs this process is running are left
+    alone. Returns (re-dispatched, failed) counts.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=app.config["KEYWORD_JOB_TIMEOUT"])
+    stale = ExtractionJob.query.filter(
+        ExtractionJob.status.in_(ACTIVE_STATUSES),
+        func.coalesce(ExtractionJob.started_at, ExtractionJob.created_at) < cutoff,
+    ).all()
+    dispatched = failed = 0
+    for job in stale:
+        if job.job_id in _futures:
+            continue
+        if job.attempts >= app.config["KEYWORD_JOB_MAX_ATTEMPTS"] or not (job.file_path and os.path.exists(job.file_path)):
+            if claim_job(job, {"status": "failed", "error": "Extraction did not complete", "finished_at": datetime.utcnow()}):
+                failed += 1
+        elif _dispatch(app, job):
+            dispatched += 1
+    return dispatched, failed
+
+
+@click.command("recover-extraction-jobs")
+@with_appcontext
+def recover_extraction_jobs():
+    """Re-run or fail keyword extraction jobs abandoned by a restarted worker, and wait for them."""
+    dispatched, failed = recover_stale_jobs(current_app._get_current_object())
+    print(f"Re-dispatched {dispatched} stale extraction jobs, marked {failed} as failed.")
+    if dispatched:
+        get_executor(current_app).shutdown(wait=True)
+
+
+def job_as_dict(job):
+    data = {"success": True, "job_id": job.job_id, "status": job.status}
+    if job.status == "done":
+        data["keywords"] = json.loads(job.keywords or "[]")
+        data["pages_processed"] = job.pages_processed
+        data["chars_processed"] = job.chars_processed
+    elif job.status == "failed":
+        data["error"] = job.error
+    return data
@@ -0,0 +1,176 @@
+import importlib.util
+import threading
+import time
+from .pdf_text import extract_text
+
+KEYBERT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Short passage run through the model once after loading, so tokenizer setup and
+# first-call graph initialisation happen before a user is waiting on it
+WARM_UP_TEXT = (
+    "Research profiles connect academics with their publications. "
+    "Keyword extraction summarises a paper's abstract and main topics."
+)
+
+_model = None
+_model_lock = threading.Lock()
+_load_reported = False  # whether this process has sent its load timings with a job result
+
+
+class ModelMetrics:
+    """
+    Load time and per-call inference timings for the keyword model. Extraction jobs run in
+    pool processes, which send their timings back with each result; the web process
+    records them here (see researchd.jobs) so its metrics endpoint sees them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.load_seconds = None
+        self.warm_up_seconds = None
+        self.calls = 0
+        self.total_inference_seconds = 0.0
+        self.last_inference_seconds = None
+        self.max_inference_seconds = 0.0
+
+    def record_load(self, load_seconds, warm_up_seconds):
+        with self._lock:
+            self.loaded = True
+            self.load_seconds = load_seconds
+            self.warm_up_seconds = warm_up_seconds
+
+    def record_timings(self, timings):
+        """Record the timings a pool process returned with a job result"""
+        if timings.get("load_seconds") is not None:
+            self.record_load(timings["load_seconds"], timings["warm_up_seconds"])
+        if timings.get("inference_seconds") is not None:
+            self.record_inference(timings["inference_seconds"])
+
+    def record_inference(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.total_inference_seconds += seconds
+            self.last_inference_seconds = seconds
+            self.max_inference_seconds = max(self.max_inference_seconds, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "model": KEYBERT_MODEL_NAME,
+                "loaded": self.loaded,
+                "load_seconds": self.load_seconds,
+                "warm_up_seconds": self.warm_up_seconds,
+                "calls": self.calls,
+                "avg_inference_seconds": self.total_inference_seconds / self.calls if self.calls else None,
+                "last_inference_seconds": self.last_inference_seconds,
+                "max_inference_seconds": self.max_inference_seconds,
+            }
+
+
+metrics = ModelMetrics()
+
+
+def keybert_available():
+    """Whether the KeyBERT package is installed in this environment"""
+    return importlib.util.find_spec("keybert") is not None
+
+
+def get_keyword_model():
+    """Return the process-wide KeyBERT model, loading and warming it up on first use"""
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        # Another thread may have finished loading while we waited on the lock
+        if _model is None:
+            # Imported here so workers and CLI commands that never extract keywords
+            # don't pay for loading torch and sentence-transformers
+            from keybert import KeyBERT
+
+            started = time.perf_counter()
+            model = KeyBERT(KEYBERT_MODEL_NAME)
+            load_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            model.extract_keywords(WARM_UP_TEXT, keyphrase_ngram_range=(1, 2), stop_words="english", top_n=1)
+            metrics.record_load(load_seconds, time.perf_counter() - started)
+
+            print(f"KeyBERT model '{KEYBERT_MODEL_NAME}' loaded in {metrics.load_seconds:.2f}s "
+                  f"(warm-up {metrics.warm_up_seconds:.2f}s)")
+            _model = model
+    return _model
+
+
+def extract_keywords_from_text(text, top_n=8):
+    """Extract keyphrases from text with the shared model"""
+    model = get_keyword_model()
+    started = time.perf_counter()
+    keywords = [kw for kw, _ in model.extract_keywords(text, keyphrase_ngram_range=(1, 2), stop_words="english", top_n=top_n)]
+    elapsed = time.perf_counter() - started
+    metrics.record_inference(elapsed)
+    print(f"Keyword extraction took {elapsed:.3f}s for {len(text)} characters")
+    return keywords
+
+
+def extract_keywords_batch(texts, top_n=8):
+    """Extract keyphrases for several documents in one model call, so embeddings run batched"""
+    if not texts:
+        return []
+    model = get_keyword_model()
+    started = time.perf_counter()
+    results = model.extract_keywords(texts, keyphrase_ngram_range=(1, 2), stop_words="english", top_n=top_n)
+    elapsed = time.perf_counter() - started
+    metrics.record_inference(elapsed)
+    print(f"Batched keyword extraction took {elapsed:.3f}s for {len(texts)} documents")
+    # KeyBERT returns a flat list for a single document
+    if len(texts) == 1:
+        results = [results]
+    return [[kw for kw, _ in keywords] for keywords in results]
+
+
+def extract_keywords_from_pdf(path, top_n=8, max_pages=None, max_chars=None):
+    """
+    Full extraction for one PDF. Runs inside the job process pool (see researchd.jobs),
+    where each pool process keeps its own model loaded between jobs.
+    Only the first max_pages pages / max_chars characters are read, which covers
+    the title page, abstract and introduction that keywords come from.
+    Returns {"text": ..., "keywords": [...], "stats": {...}, "timings": {...}}; timings
+    includes the model load only in this process's first result.
+    """
+    global _load_reported
+    text, stats = extract_text(path, max_pages=max_pages, max_chars=max_chars)
+    print(f"Read {stats.pages_processed} of {stats.page_count} pages "
+          f"({stats.pages_skipped} skipped, {stats.chars_processed} chars) from {path}")
+    if not text.strip():
+        raise ValueError("No readable text found in PDF")
+    keywords = extract_keywords_from_text(text, top_n=top_n)
+    timings = {"inference_seconds": metrics.last_inference_seconds}
+    if not _load_reported:
+        timings.update(load_seconds=metrics.load_seconds, warm_up_seconds=metrics.warm_up_seconds)
+        _load_reported = True
+    return {"text": text, "keywords": keywords, "stats": stats.as_dict(), "timings": timings}
+
+
+def preload():
+    """
+    Import the PDF reader and load the keyword model now. Used as the job pool's initializer
+    when KEYBERT_PRELOAD is set, so each pool process is ready before its first job; the
+    web process never loads the model, since torch isn't safe to use across a fork.
+    """
+    import fitz  # noqa: F401
+    if keybert_available():
+        get_keyword_model()
+
+
+def init_app(app, preload_models=None):
+    """
+    Preload heavy modules when asked to (or KEYBERT_PRELOAD is set), otherwise they load on
+    first use. PyMuPDF is imported here; the model is loaded by the job pool's processes.
+    """
+    if preload_models is None:
+        preload_models = app.config.get("KEYBERT_PRELOAD")
+    app.config["KEYBERT_PRELOAD"] = bool(preload_models)
+    if preload_models:
+        import fitz  # noqa: F401
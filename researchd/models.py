@@ -35,13 +35,34 @@ class Profile(db.Model):
     department = db.Column(db.String(150))
     bio = db.Column(db.Text)
     pfp = db.Column(db.String(255), default='default_pfp.png')  # profile picture URL
+    avatar_key = db.Column(db.String(64))  # rendered sizes under static/profile_pics/avatars/<key>/
     location = db.Column(db.String(150))
-    research_interests = db.Column(db.Text)  # comma-separated research interests
     section_order = db.Column(db.Text, nullable=True) #JSON-encoded list of section keys
     position = db.Column(db.String(150))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = db.relationship('User', backref=db.backref('profile', uselist=False))
 
+    @property
+    def interest_names(self):
+        """Research interest names in the order the owner chose"""
+        return [link.interest.name for link in self.interest_links]
+
+    def set_interests(self, names):
+        """Replace this profile's research interests, creating Interest rows as needed"""
+        names = [name for name in dict.fromkeys(n.strip()[:200] for n in names) if name]
+        existing = {i.name: i for i in Interest.query.filter(Interest.name.in_(names)).all()} if names else {}
+
+        current = {link.interest.name: link for link in self.interest_links}
+        links = []
+        for position, name in enumerate(names):
+            link = current.get(name)
+            if link is None:
+                link = ProfileInterest(interest=existing.get(name) or Interest(name=name))
+            link.position = position
+            links.append(link)
+        self.interest_links = links
+
     def get_profile_picture(self):
         """Return profile picture path, or default if not set"""
         if self.pfp and self.pfp.strip():
@@ -57,6 +78,32 @@ class Profile(db.Model):
     socials = db.relationship("Social", back_populates="profile", cascade="all, delete-orphan", passive_deletes=True)
     achievements = db.relationship("Achievement", back_populates="profile", cascade="all, delete-orphan", passive_deletes=True, order_by="Achievement.sort_order")
     external_roles = db.relationship("ExternalRole", back_populates="profile", cascade="all, delete-orphan", passive_deletes=True, order_by="ExternalRole.sort_order")
+    interest_links = db.relationship("ProfileInterest", back_populates="profile", cascade="all, delete-orphan", passive_deletes=True, order_by="ProfileInterest.position")
+
+
+def split_interests(interests):
+    """Split a comma-separated interests string (as sent by the interests editor) into names"""
+    return [interest.strip() for interest in (interests or "").split(",") if interest.strip()]
+
+
+class Interest(db.Model):
+    __tablename__ = "interests"
+
+    iid = db.Column(db.Integer, primary_key=True)  # InterestID
+    name = db.Column(db.String(200), nullable=False, unique=True, index=True)
+
+    profile_links = db.relationship("ProfileInterest", back_populates="interest")
+
+
+class ProfileInterest(db.Model):
+    __tablename__ = "profile_interests"
+
+    pid = db.Column(db.Integer, db.ForeignKey("profiles.pid", ondelete="CASCADE"), primary_key=True)
+    iid = db.Column(db.Integer, db.ForeignKey("interests.iid", ondelete="CASCADE"), primary_key=True, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)  # display order on the profile
+
+    profile = db.relationship("Profile", back_populates="interest_links")
+    interest = db.relationship("Interest", back_populates="profile_links")
 
 
 class Education(db.Model):
@@ -67,6 +114,7 @@ class Education(db.Model):
     institution = db.Column(db.String(150), nullable=False)
     start_year = db.Column(db.Integer, nullable=True)
     end_year = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="educations")
 
@@ -79,6 +127,7 @@ class Experience(db.Model):
     institution = db.Column(db.String(150), nullable=False)
     start_year = db.Column(db.Integer, nullable=True)
     end_year = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="experiences")
 
@@ -91,6 +140,7 @@ class Achievement(db.Model):
     year = db.Column(db.Integer)
     type = db.Column(db.String(100))  # e.g., 'Award', 'Grant', or 'Funds'
     sort_order = db.Column(db.Integer, nullable=True, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="achievements")
 
@@ -106,6 +156,7 @@ class ExternalRole(db.Model):
     end_year = db.Column(db.Integer, nullable=True)
     description = db.Column(db.Text)
     sort_order = db.Column(db.Integer, nullable=True, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="external_roles")
 
@@ -119,13 +170,60 @@ class File(db.Model):
     file_name = db.Column(db.String(255), nullable=False)
     file_type = db.Column(db.String(50))          # e.g., 'pdf', 'png'
     file_size = db.Column(db.Integer)             # bytes
-    file_path = db.Column(db.String(500), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)  # 'ab/cd/<sha256>.pdf' under static/uploads, or a URL
+    sha256 = db.Column(db.String(64), nullable=True, index=True)  # key of the stored blob, None for URLs
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    missing_at = db.Column(db.DateTime, nullable=True)  # set by `flask storage-gc` when the stored file is gone
 
     profile = db.relationship("Profile", back_populates="files")
+    # Not passive: SQLite doesn't enforce the FK cascade, so the ORM removes the text itself
+    text_record = db.relationship("FileText", uselist=False, cascade="all, delete-orphan")
     # reverse link from Publication via publication.file_id
 
 
+class Blob(db.Model):
+    __tablename__ = "blobs"
+
+    # One stored upload per distinct content, shared by every File row with the same hash.
+    # ref_count is maintained by researchd.storage; the file is removed when it reaches zero.
+    sha256 = db.Column(db.String(64), primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False)  # relative to static/uploads
+    size = db.Column(db.Integer)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class UploadSession(db.Model):
+    __tablename__ = "upload_sessions"
+
+    # A resumable upload in progress (see researchd.chunked_upload); the bytes are spooled
+    # under the instance folder until a paper form claims the finished upload by its token
+    token = db.Column(db.String(32), primary_key=True)
+    pid = db.Column(db.Integer, db.ForeignKey("profiles.pid", ondelete="CASCADE"), nullable=False, index=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # total bytes announced when the upload started
+    received = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default="open")  # 'open' or 'complete'
+    sha256 = db.Column(db.String(64))  # set once complete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class FileText(db.Model):
+    __tablename__ = "file_texts"
+
+    # Text extracted once from an uploaded PDF, maintained by researchd.file_text
+    fid = db.Column(db.Integer, db.ForeignKey("files.fid", ondelete="CASCADE"), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="done")  # 'done', 'empty' (no text layer), 'failed'
+    text = db.Column(db.LargeBinary)  # zlib-compressed UTF-8 text
+    sha256 = db.Column(db.String(64), index=True)  # hash of the PDF bytes, shared with extraction_cache
+    page_count = db.Column(db.Integer)
+    char_count = db.Column(db.Integer)
+    error = db.Column(db.String(500))
+    extracted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Photo(db.Model):
     __tablename__ = "photos"
 
@@ -135,6 +233,7 @@ class Photo(db.Model):
     file_path = db.Column(db.String(500), nullable=False)
     caption = db.Column(db.String(255))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="photos")
 
@@ -147,6 +246,7 @@ class Social(db.Model):
 
     platform = db.Column(db.String(50), nullable=False)  # 'LinkedIn', 'Twitter', etc.
     url = db.Column(db.String(500), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="socials")
 
@@ -170,6 +270,70 @@ class Publication(db.Model):
     # Optional link to a stored File (e.g., the uploaded PDF)
     fid = db.Column(db.Integer, db.ForeignKey("files.fid", ondelete="SET NULL"), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     profile = db.relationship("Profile", back_populates="publications")
-    file = db.relationship("File", foreign_keys=[fid])
\ No newline at end of file
+    file = db.relationship("File", foreign_keys=[fid])
+
+class ProfileSnapshot(db.Model):
+    __tablename__ = "profile_snapshots"
+
+    # Precomputed profile page document, rebuilt by researchd.profile_loader whenever the owner edits
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    document = db.Column(db.Text, nullable=False)  # JSON
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class KeywordTerm(db.Model):
+    __tablename__ = "keyword_terms"
+
+    # Document frequencies over publication abstracts/keywords for the fast keyword
+    # extractor, maintained by researchd.fast_keywords. The "*" row holds the document count.
+    term = db.Column(db.String(100), primary_key=True)
+    doc_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class FacetCount(db.Model):
+    __tablename__ = "facet_counts"
+
+    # Materialized counts behind the /search filter dropdowns, maintained by researchd.facets
+    facet = db.Column(db.String(50), primary_key=True)   # 'institution', 'position', 'interest', 'journal', 'year'
+    value = db.Column(db.String(300), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_facet_counts_facet_count", "facet", "count"),
+    )
+
+
+class ExtractionJob(db.Model):
+    __tablename__ = "extraction_jobs"
+
+    # Background keyword extraction for an uploaded PDF, run by researchd.jobs
+    job_id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    pid = db.Column(db.Integer, db.ForeignKey("profiles.pid", ondelete="CASCADE"), nullable=False, index=True)
+
+    status = db.Column(db.String(20), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    sha256 = db.Column(db.String(64))  # content hash of the PDF, used to fill the extraction cache
+    file_path = db.Column(db.String(500))  # spooled PDF under the instance folder, removed once finished
+    keywords = db.Column(db.Text)  # JSON-encoded list of keywords
+    error = db.Column(db.String(500))
+    pages_processed = db.Column(db.Integer)  # text pages read within the extraction budget
+    chars_processed = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+
+class ExtractionCache(db.Model):
+    __tablename__ = "extraction_cache"
+
+    # PDF text and keywords keyed by the SHA-256 of the PDF bytes, so repeat uploads skip extraction
+    sha256 = db.Column(db.String(64), primary_key=True)
+    text = db.Column(db.LargeBinary)  # zlib-compressed UTF-8 text
+    keywords = db.Column(db.Text)  # JSON-encoded list of keywords
+    size_bytes = db.Column(db.Integer, nullable=False, default=0)  # stored size, for size-based eviction
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
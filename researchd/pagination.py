@@ -0,0 +1,118 @@
+import base64
+import json
+import math
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(direction, values):
+    """Pack a seek position into an opaque URL-safe token"""
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps({"d": direction, "k": payload}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Unpack a cursor token, returning (direction, values) or (None, None) if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        values = [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in data["k"]]
+        if data["d"] not in ("next", "prev"):
+            return None, None
+        return data["d"], values
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+
+def seek_condition(keys, values, reverse=False):
+    """
+    Build the "rows after this position" predicate for an ordering.
+    keys is a list of (expression, descending) pairs ending in a unique column.
+    """
+    clauses = []
+    for i, (expression, descending) in enumerate(keys):
+        forward = descending == reverse
+        comparison = expression > values[i] if forward else expression < values[i]
+        equal_prefix = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, comparison))
+    return or_(*clauses)
+
+
+def order_clauses(keys, reverse=False):
+    return [expression.desc() if descending != reverse else expression.asc() for expression, descending in keys]
+
+
+class CountCache:
+    """Small in-process TTL cache for result totals so paging doesn't re-run COUNT(*) every time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key, compute, ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        value = compute()
+        with self._lock:
+            if len(self._entries) > 1000:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+            self._entries[key] = (now + ttl, value)
+        return value
+
+
+count_cache = CountCache()
+
+
+class KeysetPagination:
+    """
+    Cursor (seek) pagination over a query ordered by `keys`.
+    Exposes the same attributes the search templates use from Flask-SQLAlchemy's Pagination,
+    plus next_cursor / prev_cursor. Page numbers are carried in the URL for display only.
+    """
+
+    is_keyset = True
+
+    def __init__(self, query, keys, per_page, cursor=None, page=1, total=None):
+        self.per_page = per_page
+        self.page = max(page, 1)
+        self.total = total
+        self.pages = max(math.ceil(total / per_page), 1) if total is not None else None
+
+        direction, values = decode_cursor(cursor) if cursor else (None, None)
+        if values is not None and len(values) != len(keys):
+            direction, values = None, None
+        if direction is None:
+            self.page = 1
+        reverse = direction == "prev"
+
+        expressions = [expression for expression, _ in keys]
+        seek_query = query.add_columns(*expressions)
+        if values is not None:
+            seek_query = seek_query.filter(seek_condition(keys, values, reverse))
+        rows = seek_query.order_by(None).order_by(*order_clauses(keys, reverse)).limit(per_page + 1).all()
+
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if reverse:
+            rows.reverse()
+
+        self.items = [row[0] for row in rows]
+        positions = [list(row[1:]) for row in rows]
+
+        if reverse:
+            self.has_prev = more
+            self.has_next = True
+        else:
+            self.has_prev = direction is not None
+            self.has_next = more
+
+        self.next_cursor = encode_cursor("next", positions[-1]) if rows and self.has_next else None
+        self.prev_cursor = encode_cursor("prev", positions[0]) if rows and self.has_prev else None
+        self.prev_num = self.page - 1 if self.has_prev else None
+        self.next_num = self.page + 1 if self.has_next else None
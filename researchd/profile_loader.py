@@ -0,0 +1,224 @@
+import json
+from datetime import datetime
+from flask.cli import with_appcontext
+from sqlalchemy.orm import joinedload, selectinload
+import click
+from . import db
+from .models import Profile, Publication, ProfileInterest, ProfileSnapshot
+
+# Everything the profile page renders, loaded in a fixed number of queries:
+# profile + user, socials, interests, external roles, achievements, recent papers + files.
+# The result is also stored per profile as a JSON snapshot, rebuilt on every owner edit,
+# so viewing a profile is a single primary-key read.
+
+SNAPSHOT_VERSION = 4
+
+RECENT_PAPER_COUNT = 3
+
+DEFAULT_SECTIONS = [
+    {"section": 'profile-header', 'visible': True},
+    {'section': 'interests-section', 'visible': True},
+    {'section': 'papers-section', 'visible': True},
+    {'section': 'achievements-section', 'visible': False},
+    {'section': 'external-roles-section', 'visible': False}
+]
+
+
+def section_order_for(profile):
+    """The profile's saved section order, or the default order if none (or invalid) is saved"""
+    if profile.section_order:
+        try:
+            section_order = json.loads(profile.section_order)
+            if section_order:
+                return section_order
+        except Exception:
+            pass
+    return [dict(section) for section in DEFAULT_SECTIONS]
+
+
+def external_role_sort_key(role):
+    # Saved order first, then most recent; missing values last
+    return (role.sort_order is None, role.sort_order or 0, role.start_year is None, -(role.start_year or 0))
+
+
+def achievement_sort_key(achievement):
+    return (achievement.sort_order is None, achievement.sort_order or 0)
+
+
+def load_profile_page(user_id, refresh=False):
+    """
+    Return the template context for a researcher's profile page, or None if they have no profile.
+    Relationships the template touches are loaded eagerly so rendering issues no further queries.
+    refresh=True reloads objects and collections already in the session (used after edits).
+    """
+    query = Profile.query
+    if refresh:
+        query = query.execution_options(populate_existing=True)
+    profile = (
+        query.filter_by(user_id=user_id)
+        .options(
+            joinedload(Profile.user),
+            selectinload(Profile.socials),
+            selectinload(Profile.interest_links).joinedload(ProfileInterest.interest),
+            selectinload(Profile.external_roles),
+            selectinload(Profile.achievements),
+        )
+        .first()
+    )
+    if profile is None:
+        return None
+
+    publications = (
+        Publication.query.filter_by(pid=profile.pid)
+        .options(joinedload(Publication.file))
+        .order_by(Publication.created_at.desc())
+        .limit(RECENT_PAPER_COUNT)
+        .all()
+    )
+
+    return {
+        "profile": profile,
+        "publications": publications,
+        "section_order": section_order_for(profile),
+        "external_roles": sorted(profile.external_roles, key=external_role_sort_key),
+        "achievements": sorted(profile.achievements, key=achievement_sort_key),
+    }
+
+
+def profile_document(page):
+    """Plain-data version of a load_profile_page() context, for the JSON snapshot"""
+    profile = page["profile"]
+    return {
+        "version": SNAPSHOT_VERSION,
+        "profile": {
+            "pid": profile.pid,
+            "user_id": profile.user_id,
+            "title": profile.title,
+            "pfp": profile.pfp,
+            "avatar_key": profile.avatar_key,
+            "position": profile.position,
+            "institution": profile.institution,
+            "location": profile.location,
+            "bio": profile.bio,
+            "user": {"first_name": profile.user.first_name, "last_name": profile.user.last_name},
+            "socials": [{"platform": social.platform, "url": social.url} for social in profile.socials],
+            "interest_names": profile.interest_names,
+        },
+        "publications": [
+            {
+                "pubid": publication.pubid,
+                "title": publication.title,
+                "authors": publication.authors,
+                "journal": publication.journal,
+                "year": publication.year,
+                "abstract": publication.abstract,
+                "url": publication.url,
+                "file": {
+                    "fid": publication.file.fid,
+                    "file_path": publication.file.file_path,
+                    "missing_at": publication.file.missing_at.isoformat() if publication.file.missing_at else None,
+                } if publication.file else None,
+            }
+            for publication in page["publications"]
+        ],
+        "external_roles": [
+            {
+                "erid": role.erid,
+                "role_title": role.role_title,
+                "organization": role.organization,
+                "start_year": role.start_year,
+                "end_year": role.end_year,
+                "description": role.description,
+            }
+            for role in page["external_roles"]
+        ],
+        "achievements": [
+            {
+                "aid": achievement.aid,
+                "title": achievement.title,
+                "type": achievement.type,
+                "year": achievement.year,
+                "description": achievement.description,
+            }
+            for achievement in page["achievements"]
+        ],
+        "section_order": page["section_order"],
+    }
+
+
+def empty_profile_document(user):
+    """Profile page for a user who has no Profile row yet, built without writing one"""
+    return {
+        "version": SNAPSHOT_VERSION,
+        "profile": {
+            "pid": None,
+            "user_id": user.id,
+            "title": None,
+            "pfp": "default_pfp.png",
+            "avatar_key": None,
+            "position": None,
+            "institution": None,
+            "location": None,
+            "bio": None,
+            "user": {"first_name": user.first_name, "last_name": user.last_name},
+            "socials": [],
+            "interest_names": [],
+        },
+        "publications": [],
+        "external_roles": [],
+        "achievements": [],
+        "section_order": [dict(section) for section in DEFAULT_SECTIONS],
+    }
+
+
+def refresh_profile_snapshot(user_id):
+    """
+    Rebuild a researcher's profile snapshot inside the current transaction.
+    Call from every endpoint that changes what the profile page shows, before commit.
+    """
+    db.session.flush()
+    page = load_profile_page(user_id, refresh=True)
+    if page is None:
+        return None
+    snapshot = db.session.get(ProfileSnapshot, user_id) or ProfileSnapshot(user_id=user_id)
+    snapshot.document = json.dumps(profile_document(page))
+    snapshot.built_at = datetime.utcnow()
+    db.session.add(snapshot)
+    return snapshot
+
+
+def get_profile_page(user_id):
+    """
+    Template context for a profile page from its snapshot, or built live (without storing)
+    when no current snapshot exists. Returns None if the researcher has no profile.
+    """
+    snapshot = db.session.get(ProfileSnapshot, user_id)
+    if snapshot is not None:
+        document = json.loads(snapshot.document)
+        if document.get("version") == SNAPSHOT_VERSION:
+            return document
+    page = load_profile_page(user_id)
+    return profile_document(page) if page else None
+
+
+def rebuild_profile_snapshots():
+    """Rebuild every profile's snapshot in the current session"""
+    count = 0
+    for (user_id,) in db.session.query(Profile.user_id).all():
+        refresh_profile_snapshot(user_id)
+        count += 1
+    return count
+
+
+@click.command("rebuild-profile-snapshots")
+@with_appcontext
+def rebuild_profile_snapshots_command():
+    """Rebuild the precomputed profile page snapshots."""
+    try:
+        count = rebuild_profile_snapshots()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error rebuilding profile snapshots: {e}")
+        raise SystemExit(1)
+    print(f"Profile snapshots rebuilt for {count} profiles.")
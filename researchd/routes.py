@@ -1,17 +1,31 @@
 import json
-from flask import Blueprint, render_template, redirect, url_for, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify, current_app, abort, send_from_directory
 from flask_login import login_user, login_required, logout_user, current_user
 from flask_wtf.csrf import validate_csrf
 from researchd import csrf
 from werkzeug.utils import secure_filename
 from .forms import LoginForm, RegisterForm, EditProfileForm, UploadPaperForm, EditPaperForm
-from .models import User, Profile, Social, Publication, File, Achievement, ExternalRole
-from sqlalchemy.orm import joinedload
+from .models import User, Profile, Social, Publication, File, Achievement, ExternalRole, Interest, ProfileInterest, ExtractionJob, UploadSession, split_interests
+from sqlalchemy.orm import joinedload, selectinload
+from .search_index import paper_search, paper_ilike_filter, researcher_search, researcher_ilike_filter, index_researcher, page_search, search_file_pages, best_page_hits
+from .facets import top_facet_values
+from .pagination import KeysetPagination, count_cache, order_clauses
+from .keywords import metrics as keyword_metrics, keybert_available
+from .fast_keywords import extract_keywords_fast
+from .pdf_text import extract_text
+from .file_text import queue_file_text
+from .avatars import queue_avatar, remove_avatar_files
+from .thumbnails import queue_thumbnail, thumbnail_root, thumbnail_name, THUMBNAIL_MAX_AGE
+from .downloads import send_upload
+from .storage import ingest_upload, UnsupportedFileType, BlobRemoved
+from .chunked_upload import UploadError, start_upload, append_chunk, finish_upload, claim_upload, discard_upload, upload_as_dict
+from .profile_loader import get_profile_page, refresh_profile_snapshot, empty_profile_document
+from .conditional import conditional, profile_last_modified, paper_last_modified
+from .jobs import submit_extraction_job, job_as_dict, QueueFullError
+from .extraction_cache import file_sha256, get_cached_extraction, cached_keywords
 from . import db
 import os
 from datetime import datetime
-from keybert import KeyBERT
-import fitz
 
 auth = Blueprint("auth", __name__)
 main = Blueprint("main", __name__)
@@ -31,96 +45,24 @@ def home():
 @main.route("/profile")
 @login_required
 def my_profile():
-    # Get fresh user data with profile
-    user = User.query.get(current_user.id)
-    
-    # Ensure profile exists for current user
-    profile = Profile.query.filter_by(user_id=user.id).first()
-    if not profile:
-        profile = Profile(user_id=user.id, pfp='default_pfp.png')
-        db.session.add(profile)
-        db.session.commit()
-    
-    print(f"Loading profile for user {user.id}, interests: {profile.research_interests}")
-
-    # Sets default order for sections
-    default_sections = [
-        {"section": 'profile-header', 'visible': True},
-        {'section': 'interests-section', 'visible': True},
-        {'section': 'papers-section', 'visible': True},
-        {'section': 'achievements-section', 'visible': False},
-        {'section': 'external-roles-section', 'visible': False}
-    ]
-    if profile.section_order:
-        try:
-            section_order = json.loads(profile.section_order)
-            if not section_order:
-                section_order = default_sections
-        except Exception:
-            section_order = default_sections
-    else:
-        section_order = default_sections
-    
-    # Get user's publications (papers)
-    publications = Publication.query.filter_by(pid=profile.pid).order_by(Publication.created_at.desc()).limit(3).all()
-
-    # Load external roles
-    external_roles = ExternalRole.query.filter_by(pid=profile.pid).order_by(ExternalRole.sort_order.nulls_last(), ExternalRole.start_year.desc().nulls_last()).all()
-
-    # Load achievements in saved order
-    achievements = Achievement.query.filter_by(pid=profile.pid).order_by(Achievement.sort_order.nulls_last()).all()
-
-    print("Loaded section_order:", section_order)
-    for s in section_order:
-        print(s['section'], s['visible'], type(s['visible']))
-    
-    return render_template("profile_page.html", profile=profile, is_owner=True, publications=publications, section_order=section_order, external_roles=external_roles, achievements=achievements)
+    # Read-only: a missing profile is shown empty and created by the first edit
+    page = get_profile_page(current_user.id) or empty_profile_document(current_user)
+    return render_template("profile_page.html", is_owner=True, **page)
 
 @main.route("/profile/<int:researcher_id>")
+@conditional(profile_last_modified)
 def researcher_profile(researcher_id):
-    print(f">>> Running RESEARCHER_PROFILE route for {researcher_id} <<<")
-    researcher = User.query.get(researcher_id)
-    if not researcher:
-        from flask import abort
-        abort(404)
-    
-    is_owner = current_user.is_authenticated and current_user.id == researcher.id
-    
-    # Ensure profile exists for the researcher
-    profile = Profile.query.filter_by(user_id=researcher.id).first()
-    if not profile:
-        profile = Profile(user_id=researcher.id, pfp='default_pfp.png')
-        db.session.add(profile)
-        db.session.commit()
-
-    # Sets default order for sections
-    default_sections = [
-        {"section": 'profile-header', 'visible': True},
-        {'section': 'interests-section', 'visible': True},
-        {'section': 'papers-section', 'visible': True},
-        {'section': 'achievements-section', 'visible': False},
-        {'section': 'external-roles-section', 'visible': False}
-    ]
-    if profile.section_order:
-        try:
-            section_order = json.loads(profile.section_order)
-            if not section_order:
-                section_order = default_sections
-        except Exception:
-            section_order = default_sections
-    else:
-        section_order = default_sections
-    
-    # Get researcher's publications (papers)
-    publications = Publication.query.filter_by(pid=profile.pid).order_by(Publication.created_at.desc()).limit(3).all()
-
-    # Load external roles
-    external_roles = ExternalRole.query.filter_by(pid=profile.pid).order_by(ExternalRole.sort_order.nulls_last(), ExternalRole.start_year.desc().nulls_last()).all()
-
-    # Load achievements
-    achievements = Achievement.query.filter_by(pid=profile.pid).order_by(Achievement.sort_order.nulls_last()).all()
-    
-    return render_template("profile_page.html", profile=profile, is_owner=is_owner, publications=publications, section_order=section_order, external_roles=external_roles, achievements=achievements)
+    # Normally a single read of the precomputed snapshot
+    page = get_profile_page(researcher_id)
+    if page is None:
+        researcher = db.session.get(User, researcher_id)
+        if not researcher:
+            from flask import abort
+            abort(404)
+        page = empty_profile_document(researcher)
+
+    is_owner = current_user.is_authenticated and current_user.id == researcher_id
+    return render_template("profile_page.html", is_owner=is_owner, **page)
 
 @main.route("/search")
 def search():
@@ -132,29 +74,39 @@ def search():
     year_filter = request.args.get("year", "").strip()
     sort_by = request.args.get("sort", "name").strip()
     search_type = request.args.get("type", "researchers").strip()  # "researchers" or "papers"
+    fulltext = request.args.get("fulltext", "") == "1"  # match papers on the text inside their PDFs
     page = request.args.get("page", 1, type=int)
+    researcher_cursor = request.args.get("researcher_cursor", "").strip()
+    paper_cursor = request.args.get("paper_cursor", "").strip()
     per_page = 10  # 10 results per page
+
+    # Keyset (cursor) paging keeps deep pages as cheap as the first one.
+    # Plain ?page=N links without a cursor (e.g. old bookmarks) still use OFFSET paging.
+    use_keyset = current_app.config["SEARCH_PAGINATION"] == "keyset" and (page == 1 or researcher_cursor or paper_cursor)
+    count_ttl = current_app.config["SEARCH_COUNT_CACHE_SECONDS"]
     
     # Initialize results
     researcher_results = []
     paper_results = []
     researcher_pagination = None
     paper_pagination = None
+    page_hits = {}
     
     # Search researchers
     if search_type in ["researchers", "all"]:
         # Start with base query for researchers
-        researcher_query = User.query.join(Profile).options(joinedload(User.profile))
+        researcher_query = User.query.join(Profile).options(
+            joinedload(User.profile).selectinload(Profile.interest_links).joinedload(ProfileInterest.interest)
+        )
         
-        # Apply search query for researchers
+        # Apply search query for researchers through the directory index
+        researcher_rank = None
         if q:
-            researcher_query = researcher_query.filter(
-                (User.first_name.ilike(f"%{q}%")) |
-                (User.last_name.ilike(f"%{q}%")) |
-                (Profile.institution.ilike(f"%{q}%")) |
-                (Profile.position.ilike(f"%{q}%")) |
-                (Profile.research_interests.ilike(f"%{q}%"))
-            )
+            researcher_matches, researcher_rank = researcher_search(q)
+            if researcher_matches is not None:
+                researcher_query = researcher_query.join(researcher_matches, researcher_matches.c.user_id == User.id)
+            else:
+                researcher_query = researcher_query.filter(researcher_ilike_filter(q))
         
         # Apply filters for researchers
         if institution_filter:
@@ -164,22 +116,35 @@ def search():
             researcher_query = researcher_query.filter(Profile.position == position_filter)
         
         if interests_filter:
-            researcher_query = researcher_query.filter(Profile.research_interests.ilike(f"%{interests_filter}%"))
+            # Exact match through the indexed interest tables
+            researcher_query = researcher_query.join(ProfileInterest, ProfileInterest.pid == Profile.pid).join(
+                Interest, Interest.iid == ProfileInterest.iid
+            ).filter(Interest.name == interests_filter)
         
-        # Apply sorting for researchers
-        if sort_by == "institution":
-            researcher_query = researcher_query.order_by(Profile.institution.asc())
+        # Sort keys for researchers as (expression, descending), ending in the primary key
+        if sort_by == "relevance" and researcher_rank is not None:
+            researcher_keys = [(researcher_rank, False), (User.id, False)]
+        elif sort_by == "institution":
+            researcher_keys = [(db.func.coalesce(Profile.institution, ""), False), (User.id, False)]
         elif sort_by == "position":
-            researcher_query = researcher_query.order_by(Profile.position.asc())
+            researcher_keys = [(db.func.coalesce(Profile.position, ""), False), (User.id, False)]
         else:  # default to name
-            researcher_query = researcher_query.order_by(User.first_name.asc(), User.last_name.asc())
+            researcher_keys = [(User.first_name, False), (User.last_name, False), (User.id, False)]
         
         # Apply pagination for researchers
-        researcher_pagination = researcher_query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        if use_keyset:
+            total = count_cache.get(
+                ("researchers", q, institution_filter, position_filter, interests_filter),
+                lambda: researcher_query.order_by(None).count(),
+                count_ttl,
+            )
+            researcher_pagination = KeysetPagination(researcher_query, researcher_keys, per_page, researcher_cursor, page, total)
+        else:
+            researcher_pagination = researcher_query.order_by(*order_clauses(researcher_keys)).paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False
+            )
         researcher_results = researcher_pagination.items
     
     # Search papers
@@ -189,15 +154,19 @@ def search():
             joinedload(Publication.profile).joinedload(Profile.user)
         )
         
-        # Apply search query for papers
-        if q:
-            paper_query = paper_query.filter(
-                (Publication.title.ilike(f"%{q}%")) |
-                (Publication.authors.ilike(f"%{q}%")) |
-                (Publication.journal.ilike(f"%{q}%")) |
-                (Publication.abstract.ilike(f"%{q}%")) |
-                (Publication.keywords.ilike(f"%{q}%"))
-            )
+        # Apply search query for papers through the full-text index
+        paper_rank = None
+        if q and fulltext:
+            # Papers whose uploaded PDF has a page matching the query
+            paper_matches, paper_rank = page_search(q)
+            if paper_matches is not None:
+                paper_query = paper_query.join(paper_matches, paper_matches.c.fid == Publication.fid)
+        if q and paper_rank is None:
+            paper_matches, paper_rank = paper_search(q)
+            if paper_matches is not None:
+                paper_query = paper_query.join(paper_matches, paper_matches.c.pubid == Publication.pubid)
+            else:
+                paper_query = paper_query.filter(paper_ilike_filter(q))
         
         # Apply filters for papers
         if journal_filter:
@@ -206,54 +175,61 @@ def search():
         if year_filter:
             paper_query = paper_query.filter(Publication.year == int(year_filter))
         
-        # Apply sorting for papers
-        if sort_by == "year":
-            paper_query = paper_query.order_by(Publication.year.desc())
+        # Sort keys for papers as (expression, descending), ending in the primary key
+        if sort_by == "relevance" and paper_rank is not None:
+            paper_keys = [(paper_rank, False), (Publication.pubid, True)]
+        elif sort_by == "year":
+            paper_keys = [(db.func.coalesce(Publication.year, 0), True), (Publication.pubid, True)]
         elif sort_by == "title":
-            paper_query = paper_query.order_by(Publication.title.asc())
+            paper_keys = [(Publication.title, False), (Publication.pubid, False)]
         elif sort_by == "journal":
-            paper_query = paper_query.order_by(Publication.journal.asc())
+            paper_keys = [(db.func.coalesce(Publication.journal, ""), False), (Publication.pubid, False)]
         else:  # default to creation date
-            paper_query = paper_query.order_by(Publication.created_at.desc())
+            paper_keys = [(db.func.coalesce(Publication.created_at, datetime.min), True), (Publication.pubid, True)]
         
         # Apply pagination for papers
-        paper_pagination = paper_query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        if use_keyset:
+            total = count_cache.get(
+                ("papers", q, fulltext, journal_filter, year_filter),
+                lambda: paper_query.order_by(None).count(),
+                count_ttl,
+            )
+            paper_pagination = KeysetPagination(paper_query, paper_keys, per_page, paper_cursor, page, total)
+        else:
+            paper_pagination = paper_query.order_by(*order_clauses(paper_keys)).paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False
+            )
         paper_results = paper_pagination.items
+        if q and fulltext:
+            page_hits = best_page_hits({paper.fid for paper in paper_results if paper.fid}, q)
     
-    # Get unique values for filter dropdowns
-    institutions = db.session.query(Profile.institution).filter(Profile.institution.isnot(None), Profile.institution != "").distinct().all()
-    institutions = [inst[0] for inst in institutions if inst[0]]
-    
-    positions = db.session.query(Profile.position).filter(Profile.position.isnot(None), Profile.position != "").distinct().all()
-    positions = [pos[0] for pos in positions if pos[0]]
-    
-    # Get unique research interests (split by comma and get unique values)
-    interests_query = db.session.query(Profile.research_interests).filter(Profile.research_interests.isnot(None), Profile.research_interests != "").all()
-    interests = set()
-    for interest_row in interests_query:
-        if interest_row[0]:
-            # Split by comma and add each interest
-            for interest in interest_row[0].split(','):
-                interests.add(interest.strip())
-    interests = sorted(list(interests))
-    
-    # Get unique journals for paper filter
-    journals = db.session.query(Publication.journal).filter(Publication.journal.isnot(None), Publication.journal != "").distinct().all()
-    journals = [journal[0] for journal in journals if journal[0]]
-    
-    # Get unique years for paper filter
-    years = db.session.query(Publication.year).filter(Publication.year.isnot(None)).distinct().order_by(Publication.year.desc()).all()
-    years = [year[0] for year in years if year[0]]
+    # Filter dropdowns come from the materialized facet counts, only for the active search type
+    facet_limit = current_app.config["SEARCH_FACET_LIMIT"]
+    institutions, positions, interests, journals, years = [], [], [], [], []
+    if search_type in ["researchers", "all"]:
+        institutions = top_facet_values("institution", facet_limit, institution_filter)
+        positions = top_facet_values("position", facet_limit, position_filter)
+        interests = top_facet_values("interest", facet_limit, interests_filter)
+    if search_type in ["papers", "all"]:
+        journals = top_facet_values("journal", facet_limit, journal_filter)
+        years = top_facet_values("year", facet_limit, year_filter)
+
+    # Current search parameters, reused by the pagination links
+    search_args = dict(q=q, institution=institution_filter, position=position_filter, interests=interests_filter,
+                       journal=journal_filter, year=year_filter, sort=sort_by, type=search_type)
+    if fulltext:
+        search_args["fulltext"] = "1"
 
     return render_template("search.html", 
+                         search_args=search_args,
                          researcher_results=researcher_results,
                          paper_results=paper_results,
                          researcher_pagination=researcher_pagination,
                          paper_pagination=paper_pagination,
+                         page_hits=page_hits,
+                         fulltext=fulltext,
                          q=q,
                          institution_filter=institution_filter,
                          position_filter=position_filter,
@@ -283,11 +259,14 @@ def edit_profile():
     
     profile = Profile.query.filter_by(user_id=current_user.id).first()
     if not profile:
+        # Created on save only, so viewing the form doesn't write
         profile = Profile(user_id=current_user.id, pfp='default_pfp.png')
-        db.session.add(profile)
-        db.session.flush()  # Ensures profile.pid is available for achievements/socials
+        if request.method == "POST":
+            db.session.add(profile)
+            db.session.flush()  # Ensures profile.pid is available for achievements/socials
 
     if form.validate_on_submit():
+        replaced_picture = None
         try:
             # Update User fields
             current_user.first_name = form.first_name.data
@@ -330,20 +309,15 @@ def edit_profile():
                     filename = f"user_{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_ext}"
                     filepath = os.path.join(upload_dir, filename)
                     
-                    # Delete old profile picture if it exists
-                    if profile.pfp:
-                        old_pic_path = os.path.join(current_app.root_path, 'static', profile.pfp)
-                        if os.path.exists(old_pic_path):
-                            try:
-                                os.remove(old_pic_path)
-                            except Exception as e:
-                                print(f"Error removing old profile picture: {e}")
+                    # Old picture files are removed once the change is committed
+                    replaced_picture = (profile.pfp, profile.avatar_key)
                     
                     # Save new file
                     file.save(filepath)
                     
-                    # Store relative path in database
+                    # Store relative path in database; sizes are rendered in the background
                     profile.pfp = f"profile_pics/{filename}"
+                    profile.avatar_key = None
 
             # Update social links
             social_platforms = {
@@ -363,7 +337,12 @@ def edit_profile():
                 elif social:
                     db.session.delete(social)
 
+            index_researcher(current_user, profile)
+            refresh_profile_snapshot(current_user.id)
             db.session.commit()
+            if replaced_picture:
+                remove_avatar_files(*replaced_picture)
+                queue_avatar(current_app._get_current_object(), profile)
             return redirect(url_for("main.my_profile"))
 
         except Exception as e:
@@ -431,10 +410,12 @@ def update_interests():
             db.session.add(profile)
         
         # Update research interests
-        profile.research_interests = interests
+        profile.set_interests(split_interests(interests))
+        index_researcher(current_user, profile)
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
         
-        print(f"Interests saved successfully: {profile.research_interests}")
+        print(f"Interests saved successfully: {profile.interest_names}")
         return jsonify({'success': True})
         
     except Exception as e:
@@ -482,21 +463,19 @@ def upload_profile_picture():
         filename = f"user_{current_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_ext}"
         filepath = os.path.join(upload_dir, filename)
         
-        # Delete old profile picture if it exists
-        if profile.pfp:
-            old_pic_path = os.path.join(current_app.root_path, 'static', profile.pfp)
-            if os.path.exists(old_pic_path):
-                try:
-                    os.remove(old_pic_path)
-                except Exception as e:
-                    print(f"Error removing old profile picture: {e}")
+        # Old picture files are removed once the change is committed
+        replaced_picture = (profile.pfp, profile.avatar_key)
         
         # Save new file
         file.save(filepath)
         
-        # Store relative path in database
+        # Store relative path in database; sizes are rendered in the background
         profile.pfp = f"profile_pics/{filename}"
+        profile.avatar_key = None
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
+        remove_avatar_files(*replaced_picture)
+        queue_avatar(current_app._get_current_object(), profile)
         
         return jsonify({
             'success': True, 
@@ -508,6 +487,20 @@ def upload_profile_picture():
         print(f"Error uploading profile picture: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def store_paper_file(form, profile):
+    """
+    Store the PDF submitted with a paper form, either a finished chunked upload (by token)
+    or a file in the form itself. Returns (StoredFile, original name) or None.
+    """
+    if form.upload_token.data:
+        return claim_upload(form.upload_token.data, profile)
+    file = form.paper_file.data
+    if file and file.filename:
+        # One pass over the upload stores, hashes, sizes and type-checks it; the bytes
+        # are kept for text extraction so the file is never read back from disk
+        return ingest_upload(file, allowed_types=("pdf",), keep_data=True), file.filename
+    return None
+
 @main.route("/upload-paper", methods=["GET", "POST"])
 @login_required
 def upload_paper():
@@ -531,36 +524,21 @@ def upload_paper():
             
             # Handle file upload
             uploaded_file = None
-            if form.paper_file.data:
-                file = form.paper_file.data
-                if file and file.filename:
-                    # Create uploads directory if it doesn't exist
-                    upload_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
-                    # Generate secure filename
-                    filename = secure_filename(file.filename)
-                    # Add timestamp to avoid conflicts
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                    filename = timestamp + filename
-                    filepath = os.path.join(upload_dir, filename)
-                    
-                    # Save file
-                    file.save(filepath)
-                    
-                    # Get file size
-                    file_size = os.path.getsize(filepath)
-                    
-                    # Create File record
-                    uploaded_file = File(
-                        pid=profile.pid,
-                        file_name=file.filename,
-                        file_type='pdf',
-                        file_size=file_size,
-                        file_path=filename  # Store relative path
-                    )
-                    db.session.add(uploaded_file)
-                    db.session.flush()  # Get the file ID
+            stored = store_paper_file(form, profile)
+            if stored:
+                stored_file, original_name = stored
+                
+                # Create File record
+                uploaded_file = File(
+                    pid=profile.pid,
+                    file_name=original_name,
+                    file_type=stored_file.file_type,  # sniffed from the content
+                    file_size=stored_file.size,
+                    file_path=stored_file.file_path,  # Store relative path
+                    sha256=stored_file.sha256
+                )
+                db.session.add(uploaded_file)
+                db.session.flush()  # Get the file ID
             
             # Create Publication record
             publication = Publication(
@@ -581,10 +559,18 @@ def upload_paper():
                 publication.fid = uploaded_file.fid
             
             db.session.add(publication)
+            refresh_profile_snapshot(current_user.id)
             db.session.commit()
+
+            if uploaded_file:
+                queue_file_text(current_app._get_current_object(), uploaded_file, data=stored_file.data)
+                queue_thumbnail(current_app._get_current_object(), uploaded_file, data=stored_file.data)
             
             return redirect(url_for("main.my_profile"))
             
+        except (UploadError, UnsupportedFileType, BlobRemoved) as e:
+            db.session.rollback()
+            form.paper_file.errors.append(str(e))
         except Exception as e:
             db.session.rollback()
             print(f"Error uploading paper: {str(e)}")
@@ -599,15 +585,13 @@ def upload_paper():
 def my_papers():
     """Display user's uploaded papers"""
     profile = Profile.query.filter_by(user_id=current_user.id).first()
-    if not profile:
-        profile = Profile(user_id=current_user.id, pfp='default_pfp.png')
-        db.session.add(profile)
-        db.session.commit()
-    
-    papers = Publication.query.filter_by(pid=profile.pid).order_by(Publication.created_at.desc()).all()
+    papers = []
+    if profile:
+        papers = Publication.query.filter_by(pid=profile.pid).order_by(Publication.created_at.desc()).all()
     return render_template("my_papers.html", papers=papers)
 
 @main.route("/researcher-papers/<int:researcher_id>")
+@conditional(profile_last_modified)
 def researcher_papers(researcher_id):
     """Display papers for a specific researcher"""
     researcher = User.query.get(researcher_id)
@@ -615,20 +599,21 @@ def researcher_papers(researcher_id):
         from flask import abort
         abort(404)
     
-    # Ensure profile exists for the researcher
     profile = Profile.query.filter_by(user_id=researcher.id).first()
-    if not profile:
-        profile = Profile(user_id=researcher.id)
-        db.session.add(profile)
-        db.session.commit()
-    
-    papers = Publication.query.filter_by(pid=profile.pid).order_by(Publication.created_at.desc()).all()
+    papers = []
+    if profile:
+        papers = Publication.query.filter_by(pid=profile.pid).order_by(Publication.created_at.desc()).all()
     return render_template("researcher_papers.html", papers=papers, researcher=researcher, profile=profile)
 
 @main.route("/paper/<int:paper_id>")
+@conditional(paper_last_modified)
 def paper_detail(paper_id):
     paper = Publication.query.get_or_404(paper_id)
-    return render_template("paper_detail.html", paper=paper)
+
+    # "Search inside this paper" runs against the page index, not the PDF
+    q = request.args.get("q", "").strip()
+    hits = search_file_pages(paper.fid, q) if q and paper.fid else []
+    return render_template("paper_detail.html", paper=paper, q=q, hits=hits)
 
 @main.route("/edit-paper/<int:paper_id>", methods=["GET", "POST"])
 @login_required
@@ -666,50 +651,40 @@ def edit_paper(paper_id):
             paper.keywords = form.keywords.data
             
             # Handle file upload if provided
-            if form.paper_file.data:
-                file = form.paper_file.data
-                if file and file.filename:
-                    # Create uploads directory if it doesn't exist
-                    upload_dir = os.path.join(current_app.root_path, 'static', 'uploads')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
-                    # Generate secure filename
-                    filename = secure_filename(file.filename)
-                    # Add timestamp to avoid conflicts
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                    filename = timestamp + filename
-                    filepath = os.path.join(upload_dir, filename)
-                    
-                    # Save file
-                    file.save(filepath)
-                    
-                    # Get file size
-                    file_size = os.path.getsize(filepath)
-                    
-                    # Delete old file if it exists
-                    if paper.file:
-                        old_file_path = os.path.join(upload_dir, paper.file.file_path)
-                        if os.path.exists(old_file_path):
-                            os.remove(old_file_path)
-                        db.session.delete(paper.file)
-                    
-                    # Create new File record
-                    new_file = File(
-                        pid=profile.pid,
-                        file_name=file.filename,
-                        file_type='pdf',
-                        file_size=file_size,
-                        file_path=filename  # Store relative path
-                    )
-                    db.session.add(new_file)
-                    db.session.flush()  # Get the file ID
-                    
-                    # Update paper to link to new file
-                    paper.fid = new_file.fid
+            stored = store_paper_file(form, profile)
+            if stored:
+                stored_file, original_name = stored
+                
+                # Delete the old File row; its blob is removed once nothing else references it
+                if paper.file:
+                    db.session.delete(paper.file)
+                
+                # Create new File record
+                new_file = File(
+                    pid=profile.pid,
+                    file_name=original_name,
+                    file_type=stored_file.file_type,  # sniffed from the content
+                    file_size=stored_file.size,
+                    file_path=stored_file.file_path,  # Store relative path
+                    sha256=stored_file.sha256
+                )
+                db.session.add(new_file)
+                db.session.flush()  # Get the file ID
+                
+                # Update paper to link to new file
+                paper.fid = new_file.fid
             
+            refresh_profile_snapshot(current_user.id)
             db.session.commit()
+
+            if stored and paper.file:
+                queue_file_text(current_app._get_current_object(), paper.file, data=stored_file.data)
+                queue_thumbnail(current_app._get_current_object(), paper.file, data=stored_file.data)
             return redirect(url_for("main.my_papers"))
             
+        except (UploadError, UnsupportedFileType, BlobRemoved) as e:
+            db.session.rollback()
+            form.paper_file.errors.append(str(e))
         except Exception as e:
             db.session.rollback()
             print(f"Error updating paper: {str(e)}")
@@ -731,9 +706,9 @@ def edit_paper(paper_id):
     
     return render_template("edit_paper.html", form=form, paper=paper)
 
-@main.route("/download/<filename>")
+@main.route("/download/<int:fid>")
 @login_required
-def download_file(filename):
+def download_file(fid):
     """Securely serve uploaded files with option to preview inline"""
     try:
         # Verify the file belongs to the current user
@@ -741,78 +716,152 @@ def download_file(filename):
         if not profile:
             return redirect(url_for("main.my_profile"))
         
-        file_record = File.query.filter_by(file_path=filename, pid=profile.pid).first()
-        if not file_record:
+        # By id: the owner's identical uploads share one stored file (and file_path)
+        file_record = db.session.get(File, fid)
+        if not file_record or file_record.pid != profile.pid:
             return redirect(url_for("main.my_profile"))
         
-        file_path = os.path.join(current_app.root_path, 'static', 'uploads')
-        if os.path.exists(os.path.join(file_path, filename)):
-            # Use send_from_directory with as_attachment=False to preview inline
-            return send_from_directory(file_path, filename, as_attachment=False, mimetype='application/pdf')
-        else:
+        # Inline so the browser's PDF viewer can open it (and fetch byte ranges)
+        response = send_upload(file_record, as_attachment=False)
+        if response is None:
             return redirect(url_for("main.my_profile"))
+        return response
             
     except Exception as e:
         print(f"Error serving file: {str(e)}")
         return redirect(url_for("main.my_profile"))
 
-@main.route("/public-download/<path:filename>")
-def public_download_file(filename):
+@main.route("/public-download/<int:fid>")
+def public_download_file(fid):
     """Publicly serve uploaded PDF files for download"""
+    from flask import flash
     try:
-        from urllib.parse import unquote
-        from flask import flash, render_template
-        # URL decode the filename
-        decoded_filename = unquote(filename)
-        
-        # Verify the file exists in the database
-        file_record = File.query.filter_by(file_path=decoded_filename).first()
+        # By id: identical uploads share one stored file (and file_path) across File rows,
+        # and the download name has to be this record's
+        file_record = db.session.get(File, fid)
         if not file_record:
             flash("File not found in database.", "error")
             return redirect(url_for("main.home"))
         
         # Check if it's a URL (external file) or local file
-        if decoded_filename.startswith(('http://', 'https://')):
+        if file_record.file_path.startswith(('http://', 'https://')):
             # It's an external URL, redirect to it
-            return redirect(decoded_filename)
+            return redirect(file_record.file_path)
         else:
-            # It's a local file
-            file_path = os.path.join(current_app.root_path, 'static', 'uploads')
-            local_file_path = os.path.join(file_path, decoded_filename)
-            
-            if os.path.exists(local_file_path):
-                # Use send_from_directory with as_attachment=True to force download
-                from flask import Response
-                import mimetypes
-                
-                # Get the MIME type
-                mime_type, _ = mimetypes.guess_type(local_file_path)
-                if not mime_type:
-                    mime_type = 'application/pdf'
-                
-                # Read the file and create response with proper headers
-                with open(local_file_path, 'rb') as f:
-                    file_data = f.read()
-                
-                response = Response(
-                    file_data,
-                    mimetype=mime_type,
-                    headers={
-                        'Content-Disposition': f'attachment; filename="{decoded_filename}"',
-                        'Content-Length': str(len(file_data))
-                    }
-                )
-                return response
-            else:
+            # It's a local file; streamed (or offloaded to the proxy), never read into memory
+            response = send_upload(file_record, as_attachment=True)
+            if response is None:
                 # File doesn't exist on disk, but record exists in database
                 flash("The requested file is no longer available for download.", "error")
                 return redirect(url_for("main.home"))
+            return response
             
     except Exception as e:
         print(f"Error serving public file: {str(e)}")
         flash("An error occurred while downloading the file.", "error")
         return redirect(url_for("main.home"))
 
+@main.route("/thumbnails/<sha256>.jpg")
+def paper_thumbnail(sha256):
+    """First-page preview of an uploaded PDF, cached by content hash"""
+    if len(sha256) != 64 or not all(c in "0123456789abcdef" for c in sha256):
+        abort(404)
+    root = thumbnail_root(current_app)
+    if os.path.isfile(os.path.join(root, thumbnail_name(sha256))):
+        response = send_from_directory(root, thumbnail_name(sha256), mimetype="image/jpeg", max_age=THUMBNAIL_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
+
+    # Not rendered yet: queue it and let the page show no preview until it exists
+    file_record = File.query.filter_by(sha256=sha256).first()
+    if file_record is not None:
+        queue_thumbnail(current_app._get_current_object(), file_record)
+    response = current_app.response_class(status=404)
+    response.cache_control.no_store = True
+    return response
+
+def owned_upload(token):
+    profile = Profile.query.filter_by(user_id=current_user.id).first()
+    if not profile:
+        return None
+    return UploadSession.query.filter_by(token=token, pid=profile.pid).first()
+
+def upload_error_response(e, upload=None):
+    data = {"success": False, "error": str(e)}
+    if upload is not None:
+        data["offset"] = upload.received  # where the client should resume from
+    return jsonify(data), e.status
+
+@main.route("/uploads", methods=["POST"])
+@login_required
+def start_chunked_upload():
+    """Start a resumable upload: JSON {file_name, size} -> token, offset and chunk size"""
+    data = request.get_json(silent=True) or {}
+    profile = Profile.query.filter_by(user_id=current_user.id).first()
+    if not profile:
+        profile = Profile(user_id=current_user.id, pfp='default_pfp.png')
+        db.session.add(profile)
+        db.session.commit()
+    try:
+        size = int(data.get("size") or 0)
+        upload = start_upload(profile, data.get("file_name", ""), size)
+    except ValueError:
+        return jsonify({"success": False, "error": "Invalid size"}), 400
+    except UploadError as e:
+        return upload_error_response(e)
+    return jsonify(upload_as_dict(upload)), 201
+
+@main.route("/uploads/<token>", methods=["GET"])
+@login_required
+def chunked_upload_status(token):
+    """Offset received so far, for resuming after a dropped connection"""
+    upload = owned_upload(token)
+    if not upload:
+        return jsonify({"success": False, "error": "Upload not found"}), 404
+    return jsonify(upload_as_dict(upload))
+
+@main.route("/uploads/<token>", methods=["PUT"])
+@login_required
+def append_chunked_upload(token):
+    """Append the raw request body at the Upload-Offset header's position"""
+    upload = owned_upload(token)
+    if not upload:
+        return jsonify({"success": False, "error": "Upload not found"}), 404
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return upload_error_response(UploadError("Upload-Offset header is required"), upload)
+    try:
+        append_chunk(upload, offset, request.stream, request.content_length)
+    except UploadError as e:
+        db.session.rollback()
+        return upload_error_response(e, upload)
+    return jsonify(upload_as_dict(upload))
+
+@main.route("/uploads/<token>/finish", methods=["POST"])
+@login_required
+def finish_chunked_upload(token):
+    """Verify the upload is complete; the token can then be submitted with a paper form"""
+    upload = owned_upload(token)
+    if not upload:
+        return jsonify({"success": False, "error": "Upload not found"}), 404
+    try:
+        finish_upload(upload)
+    except UploadError as e:
+        db.session.rollback()
+        return upload_error_response(e, upload)
+    return jsonify(upload_as_dict(upload))
+
+@main.route("/uploads/<token>", methods=["DELETE"])
+@login_required
+def cancel_chunked_upload(token):
+    upload = owned_upload(token)
+    if not upload:
+        return jsonify({"success": False, "error": "Upload not found"}), 404
+    discard_upload(current_app._get_current_object(), upload)
+    db.session.commit()
+    return jsonify({"success": True})
+
 @auth.route("/login", methods=["GET", "POST"])
 def login():
     form = LoginForm()
@@ -866,6 +915,8 @@ def register():
         )
 
         db.session.add(profile)
+        index_researcher(user, profile)
+        refresh_profile_snapshot(user.id)
         db.session.commit()
 
         return redirect(url_for("auth.login"))
@@ -891,6 +942,7 @@ def save_section_order():
     if not profile:
         return jsonify({'success': False, 'error': 'Profile not found'}), 400
     profile.section_order = json.dumps(order)
+    refresh_profile_snapshot(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -932,6 +984,7 @@ def add_external_role():
             sort_order=next_sort
         )
         db.session.add(er)
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
 
         return jsonify({
@@ -964,6 +1017,7 @@ def delete_external_role(erid):
             return jsonify({"success": False, "error": "External role not found"}), 404
 
         db.session.delete(er)
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -992,6 +1046,7 @@ def update_external_role_order():
             er = ExternalRole.query.filter_by(erid=int(erid), pid=profile.pid).first()
             if er:
                 er.sort_order = index
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -1031,6 +1086,7 @@ def add_achievement():
             description=description
         )
         db.session.add(ach)
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
 
         return jsonify({
@@ -1061,6 +1117,7 @@ def delete_achievement(aid):
             return jsonify({"success": False, "error": "Achievement not found"}), 404
 
         db.session.delete(ach)
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -1077,6 +1134,7 @@ def update_achievement_order():
             ach = Achievement.query.get(int(achid))
             if ach:
                 ach.sort_order = idx
+        refresh_profile_snapshot(current_user.id)
         db.session.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -1087,19 +1145,71 @@ def update_achievement_order():
 @csrf.exempt
 @login_required
 def extract_keywords():
-    kw_model = KeyBERT('all-MiniLM-L6-v2')
-
+    """
+    Extract keywords from a PDF. The KeyBERT engine queues a job and returns a job id to poll;
+    the fast engine answers directly. The engine comes from the request or KEYWORD_ENGINE.
+    """
     file = request.files.get('pdf')
     if not file or not file.filename.endswith('.pdf'):
         return jsonify({'success': False, 'error': 'Invalid or missing PDF'}), 400
 
-    text = ""
-    with fitz.open(stream=file.read(), filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text("text")
+    engine = request.form.get('engine') or current_app.config['KEYWORD_ENGINE']
+    if engine not in ('keybert', 'fast', 'auto'):
+        return jsonify({'success': False, 'error': 'Unknown keyword engine'}), 400
+
+    profile = Profile.query.filter_by(user_id=current_user.id).first()
+    if not profile:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 400
+
+    # Repeat uploads of the same PDF are answered from the content-hash cache
+    sha256 = file_sha256(file)
+    cached = get_cached_extraction(sha256)
+    if cached:
+        return jsonify({'success': True, 'status': 'done', 'cached': True, 'keywords': cached_keywords(cached)})
 
+    if engine == 'auto' and not keybert_available():
+        engine = 'fast'
+    if engine == 'fast':
+        return fast_keyword_response(file)
+
+    try:
+        job = submit_extraction_job(current_app._get_current_object(), profile, file, sha256)
+    except QueueFullError as e:
+        if engine == 'auto':
+            return fast_keyword_response(file)
+        return jsonify({'success': False, 'error': str(e)}), 429
+
+    response = job_as_dict(job)
+    response['status_url'] = url_for('main.extract_keywords_status', job_id=job.job_id)
+    return jsonify(response), 202
+
+def fast_keyword_response(file):
+    """Keywords from the corpus TF-IDF extractor, computed in the request"""
+    try:
+        text, _ = extract_text(file.read(),
+                               max_pages=current_app.config['KEYWORD_MAX_PAGES'],
+                               max_chars=current_app.config['KEYWORD_MAX_CHARS'])
+    except Exception as e:
+        print(f"Error reading PDF for keyword extraction: {e}")
+        return jsonify({'success': False, 'error': 'Could not read PDF'}), 400
     if not text.strip():
         return jsonify({'success': False, 'error': 'No readable text found in PDF'}), 400
+    return jsonify({'success': True, 'status': 'done', 'engine': 'fast', 'keywords': extract_keywords_fast(text)})
 
-    keywords = [kw for kw, _ in kw_model.extract_keywords(text, keyphrase_ngram_range=(1, 2), stop_words='english', top_n=8)]
-    return jsonify({'success': True, 'keywords': keywords})
\ No newline at end of file
+@main.route('/extract_keywords/jobs/<job_id>')
+@login_required
+def extract_keywords_status(job_id):
+    """Status (and keywords, once done) of an extraction job"""
+    profile = Profile.query.filter_by(user_id=current_user.id).first()
+    job = ExtractionJob.query.filter_by(job_id=job_id, pid=profile.pid if profile else None).first()
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    # Read-only: abandoned jobs are recovered on the next submit or by `flask recover-extraction-jobs`
+    return jsonify(job_as_dict(job))
+
+@main.route('/extract_keywords/metrics')
+@login_required
+def keyword_model_metrics():
+    """Load time and inference timings of the keyword model in this worker's job pool"""
+    return jsonify(keyword_metrics.as_dict())
\ No newline at end of file
@@ -0,0 +1,564 @@
+import re
+import zlib
+from flask.cli import with_appcontext
+from markupsafe import Markup, escape
+from sqlalchemy import event, text, literal_column, func, select, or_, table, column
+import click
+from . import db
+from .models import Publication, Profile, User, Interest, ProfileInterest, File, FileText
+from .pdf_text import split_pages
+
+# Full-text index over publications.
+# SQLite uses an external-content FTS5 table kept in sync by triggers,
+# PostgreSQL uses a generated tsvector column with a GIN index.
+PAPER_FTS_TABLE = "publications_fts"
+
+# bm25() column weights, in the same order as the FTS5 columns below
+PAPER_FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 3.0)
+
+SQLITE_PAPER_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PAPER_FTS_TABLE} USING fts5(
+        title, authors, journal, abstract, keywords,
+        content='publications', content_rowid='pubid',
+        tokenize='porter unicode61', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS publications_fts_ai AFTER INSERT ON publications BEGIN
+        INSERT INTO {PAPER_FTS_TABLE}(rowid, title, authors, journal, abstract, keywords)
+        VALUES (new.pubid, new.title, new.authors, new.journal, new.abstract, new.keywords);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS publications_fts_ad AFTER DELETE ON publications BEGIN
+        INSERT INTO {PAPER_FTS_TABLE}({PAPER_FTS_TABLE}, rowid, title, authors, journal, abstract, keywords)
+        VALUES ('delete', old.pubid, old.title, old.authors, old.journal, old.abstract, old.keywords);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS publications_fts_au AFTER UPDATE ON publications BEGIN
+        INSERT INTO {PAPER_FTS_TABLE}({PAPER_FTS_TABLE}, rowid, title, authors, journal, abstract, keywords)
+        VALUES ('delete', old.pubid, old.title, old.authors, old.journal, old.abstract, old.keywords);
+        INSERT INTO {PAPER_FTS_TABLE}(rowid, title, authors, journal, abstract, keywords)
+        VALUES (new.pubid, new.title, new.authors, new.journal, new.abstract, new.keywords);
+    END""",
+]
+
+POSTGRES_PAPER_INDEX = [
+    """ALTER TABLE publications ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(keywords, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(authors, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(journal, '')), 'C') ||
+            setweight(to_tsvector('english', coalesce(abstract, '')), 'D')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_publications_search_vector ON publications USING GIN (search_vector)",
+]
+
+
+def create_paper_index(connection):
+    """Create the paper full-text index for the connection's backend"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_PAPER_INDEX
+    elif dialect == "postgresql":
+        statements = POSTGRES_PAPER_INDEX
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_paper_index(connection):
+    """Drop the paper full-text index (triggers go with the publications table)"""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {PAPER_FTS_TABLE}"))
+
+
+def rebuild_paper_index(connection):
+    """Repopulate the paper index from the publications table"""
+    if connection.dialect.name == "sqlite":
+        create_paper_index(connection)
+        connection.execute(text(f"INSERT INTO {PAPER_FTS_TABLE}({PAPER_FTS_TABLE}) VALUES ('rebuild')"))
+    elif connection.dialect.name == "postgresql":
+        # The generated column is always current, so only the index needs refreshing
+        create_paper_index(connection)
+        connection.execute(text("REINDEX INDEX ix_publications_search_vector"))
+
+
+# Researcher directory index.
+# It spans User and Profile, so rows are written by the application (see index_researcher)
+# rather than by triggers. rowid / user_id is the User id.
+RESEARCHER_FTS_TABLE = "researchers_fts"
+
+# bm25() column weights: first_name, last_name, institution, position, research_interests
+RESEARCHER_FTS_WEIGHTS = (10.0, 10.0, 3.0, 2.0, 4.0)
+
+SQLITE_RESEARCHER_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {RESEARCHER_FTS_TABLE} USING fts5(
+        first_name, last_name, institution, position, research_interests,
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+]
+
+POSTGRES_RESEARCHER_INDEX = [
+    f"""CREATE TABLE IF NOT EXISTS {RESEARCHER_FTS_TABLE} (
+        user_id INTEGER PRIMARY KEY REFERENCES "user"(id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{RESEARCHER_FTS_TABLE}_document ON {RESEARCHER_FTS_TABLE} USING GIN (document)",
+]
+
+# Names are weighted 'A' so prefix matches can be restricted to them
+POSTGRES_RESEARCHER_DOCUMENT = """
+    setweight(to_tsvector('simple', coalesce(:first_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(:last_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(:research_interests, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(:institution, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(:position, '')), 'C')
+"""
+
+
+def create_researcher_index(connection):
+    """Create the researcher search index for the connection's backend"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_RESEARCHER_INDEX
+    elif dialect == "postgresql":
+        statements = POSTGRES_RESEARCHER_INDEX
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_researcher_index(connection):
+    """Drop the researcher search index"""
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        connection.execute(text(f"DROP TABLE IF EXISTS {RESEARCHER_FTS_TABLE}"))
+
+
+def researcher_document(user, profile):
+    """Column values indexed for one researcher"""
+    return {
+        "user_id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "institution": profile.institution if profile else None,
+        "position": profile.position if profile else None,
+        "research_interests": ", ".join(profile.interest_names) if profile else None,
+    }
+
+
+def write_researcher_documents(connection, documents):
+    """Insert or replace researcher index rows"""
+    dialect = connection.dialect.name
+    if not documents:
+        return
+    if dialect == "sqlite":
+        connection.execute(
+            text(f"DELETE FROM {RESEARCHER_FTS_TABLE} WHERE rowid = :user_id"),
+            [{"user_id": d["user_id"]} for d in documents],
+        )
+        connection.execute(
+            text(f"""INSERT INTO {RESEARCHER_FTS_TABLE}
+                     (rowid, first_name, last_name, institution, position, research_interests)
+                     VALUES (:user_id, :first_name, :last_name, :institution, :position, :research_interests)"""),
+            documents,
+        )
+    elif dialect == "postgresql":
+        connection.execute(
+            text(f"""INSERT INTO {RESEARCHER_FTS_TABLE} (user_id, document)
+                     VALUES (:user_id, {POSTGRES_RESEARCHER_DOCUMENT})
+                     ON CONFLICT (user_id) DO UPDATE SET document = excluded.document"""),
+            documents,
+        )
+
+
+def rebuild_researcher_index(connection):
+    """Repopulate the researcher index from the user and profiles tables"""
+    if connection.dialect.name not in ("sqlite", "postgresql"):
+        return
+    create_researcher_index(connection)
+    connection.execute(text(f"DELETE FROM {RESEARCHER_FTS_TABLE}"))
+    interests = {}
+    for pid, name in connection.execute(
+        select(ProfileInterest.pid, Interest.name)
+        .join(Interest, Interest.iid == ProfileInterest.iid)
+        .order_by(ProfileInterest.pid, ProfileInterest.position)
+    ):
+        interests.setdefault(pid, []).append(name)
+
+    rows = connection.execute(
+        select(
+            User.id.label("user_id"),
+            User.first_name,
+            User.last_name,
+            Profile.pid,
+            Profile.institution,
+            Profile.position,
+        ).join(Profile, Profile.user_id == User.id)
+    )
+    documents = []
+    for row in rows:
+        document = dict(row._mapping)
+        document["research_interests"] = ", ".join(interests.get(document.pop("pid"), []))
+        documents.append(document)
+    write_researcher_documents(connection, documents)
+
+
+def index_researcher(user, profile=None):
+    """
+    Refresh one researcher's index row inside the current transaction.
+    Call after changing the user's name or their profile, before commit.
+    """
+    if profile is None:
+        profile = Profile.query.filter_by(user_id=user.id).first()
+    db.session.flush()
+    write_researcher_documents(db.session.connection(), [researcher_document(user, profile)])
+
+
+# Page index over the stored text of uploaded PDFs (see researchd.file_text), one row per page.
+# Rows are written when a file's text is stored. On SQLite the rowid encodes the file and
+# page, so all pages of a file are one rowid range.
+PAGE_FTS_TABLE = "file_pages_fts"
+PAGE_ROWID_STRIDE = 100000
+
+# Snippet markers; page text is escaped for HTML and these become <mark> tags
+HIT_START, HIT_END = "\x02", "\x03"
+SNIPPET_TOKENS = 16
+
+SQLITE_PAGE_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PAGE_FTS_TABLE} USING fts5(
+        body, tokenize='porter unicode61'
+    )""",
+]
+
+POSTGRES_PAGE_INDEX = [
+    f"""CREATE TABLE IF NOT EXISTS {PAGE_FTS_TABLE} (
+        fid INTEGER NOT NULL REFERENCES files(fid) ON DELETE CASCADE,
+        page INTEGER NOT NULL,
+        body TEXT NOT NULL,
+        document tsvector GENERATED ALWAYS AS (to_tsvector('english', body)) STORED,
+        PRIMARY KEY (fid, page)
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{PAGE_FTS_TABLE}_document ON {PAGE_FTS_TABLE} USING GIN (document)",
+]
+
+
+def create_page_index(connection):
+    """Create the PDF page search index for the connection's backend"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_PAGE_INDEX
+    elif dialect == "postgresql":
+        statements = POSTGRES_PAGE_INDEX
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_page_index(connection):
+    """Drop the PDF page search index"""
+    if connection.dialect.name in ("sqlite", "postgresql"):
+        connection.execute(text(f"DROP TABLE IF EXISTS {PAGE_FTS_TABLE}"))
+
+
+def delete_file_pages(connection, fid):
+    """Remove a file's pages from the page index"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        connection.execute(
+            text(f"DELETE FROM {PAGE_FTS_TABLE} WHERE rowid >= :low AND rowid < :high"),
+            {"low": fid * PAGE_ROWID_STRIDE, "high": (fid + 1) * PAGE_ROWID_STRIDE},
+        )
+    elif dialect == "postgresql":
+        connection.execute(text(f"DELETE FROM {PAGE_FTS_TABLE} WHERE fid = :fid"), {"fid": fid})
+
+
+def write_file_pages(connection, fid, pages):
+    """Replace a file's rows in the page index; pages is [(page_number, text), ...]"""
+    dialect = connection.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return
+    delete_file_pages(connection, fid)
+    rows = [
+        {"fid": fid, "page": page, "rowid": fid * PAGE_ROWID_STRIDE + page,
+         "body": body.replace(HIT_START, " ").replace(HIT_END, " ")}
+        for page, body in pages
+        if body.strip() and page < PAGE_ROWID_STRIDE
+    ]
+    if not rows:
+        return
+    if dialect == "sqlite":
+        connection.execute(text(f"INSERT INTO {PAGE_FTS_TABLE} (rowid, body) VALUES (:rowid, :body)"), rows)
+    else:
+        connection.execute(text(f"INSERT INTO {PAGE_FTS_TABLE} (fid, page, body) VALUES (:fid, :page, :body)"), rows)
+
+
+def rebuild_page_index(connection):
+    """Repopulate the page index from the stored file text"""
+    if connection.dialect.name not in ("sqlite", "postgresql"):
+        return 0
+    create_page_index(connection)
+    connection.execute(text(f"DELETE FROM {PAGE_FTS_TABLE}"))
+    count = 0
+    rows = connection.execute(select(FileText.fid, FileText.text).where(FileText.status == "done"))
+    for fid, compressed in rows.all():
+        write_file_pages(connection, fid, split_pages(zlib.decompress(compressed).decode("utf-8")))
+        count += 1
+    return count
+
+
+def highlight_snippet(raw):
+    """Escape an index snippet for HTML, turning the hit markers into <mark> tags"""
+    return Markup(str(escape(raw)).replace(HIT_START, "<mark>").replace(HIT_END, "</mark>"))
+
+
+def _page_matches(q, fids=None, snippets=True):
+    """
+    CTE of (fid, page, rank[, snippet]) for the indexed pages matching q; lower rank is better.
+    fids restricts the full-text query itself to those files, so only their pages are
+    ranked and given snippets. Returns None when the backend has no page index or q has no terms.
+    """
+    dialect = db.session.get_bind().dialect.name
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    if dialect == "sqlite":
+        fts = literal_column(PAGE_FTS_TABLE)
+        fts_table = table(PAGE_FTS_TABLE, column("rowid"))
+        columns = [
+            fts_table.c.rowid.op("/")(PAGE_ROWID_STRIDE).label("fid"),
+            fts_table.c.rowid.op("%")(PAGE_ROWID_STRIDE).label("page"),
+            func.bm25(fts).label("rank"),
+        ]
+        if snippets:
+            columns.append(func.snippet(fts, 0, HIT_START, HIT_END, "…", SNIPPET_TOKENS).label("snippet"))
+        query = select(*columns).where(fts.op("MATCH")(fts_match_expression(q)))
+        if fids is not None:
+            # A file's pages are one rowid range; FTS5 narrows its scan to the outer range
+            fids = sorted(fids)
+            query = query.where(
+                fts_table.c.rowid.between(fids[0] * PAGE_ROWID_STRIDE, (fids[-1] + 1) * PAGE_ROWID_STRIDE - 1),
+                or_(*[fts_table.c.rowid.between(fid * PAGE_ROWID_STRIDE, (fid + 1) * PAGE_ROWID_STRIDE - 1) for fid in fids]),
+            )
+        return query.cte("page_matches")
+
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery("english", " & ".join(terms[:-1] + [terms[-1] + ":*"]))
+        fts_table = table(PAGE_FTS_TABLE, column("fid"), column("page"), column("body"), column("document"))
+        columns = [fts_table.c.fid, fts_table.c.page, (-func.ts_rank_cd(fts_table.c.document, ts_query)).label("rank")]
+        if snippets:
+            options = f"StartSel={HIT_START}, StopSel={HIT_END}, MaxWords={SNIPPET_TOKENS * 2}, MinWords={SNIPPET_TOKENS}"
+            columns.append(func.ts_headline("english", fts_table.c.body, ts_query, options).label("snippet"))
+        query = select(*columns).where(fts_table.c.document.op("@@")(ts_query))
+        if fids is not None:
+            query = query.where(fts_table.c.fid.in_(list(fids)))
+        return query.cte("page_matches")
+
+    return None
+
+
+def search_file_pages(fid, q, limit=50):
+    """Pages of one file matching q, in page order, as [{"page": n, "snippet": Markup}, ...]"""
+    matches = _page_matches(q, fids=[fid])
+    if matches is None:
+        return []
+    rows = db.session.execute(
+        select(matches.c.page, matches.c.snippet).order_by(matches.c.page).limit(limit)
+    ).all()
+    return [{"page": row.page, "snippet": highlight_snippet(row.snippet)} for row in rows]
+
+
+def best_page_hits(fids, q):
+    """Best-ranked matching page per file, as {fid: {"page": n, "snippet": Markup}}"""
+    if not fids:
+        return {}
+    matches = _page_matches(q, fids=fids)
+    if matches is None:
+        return {}
+    rows = db.session.execute(
+        select(matches.c.fid, matches.c.page, matches.c.snippet).order_by(matches.c.rank)
+    ).all()
+    hits = {}
+    for row in rows:
+        hits.setdefault(row.fid, {"page": row.page, "snippet": highlight_snippet(row.snippet)})
+    return hits
+
+
+def page_search(q):
+    """
+    Return a (subquery, rank) pair for files with a page matching q.
+    The subquery has `fid` and `rank` (best page) columns; lower rank is more relevant.
+    Returns (None, None) when the backend has no page index.
+    """
+    matches = _page_matches(q, snippets=False)
+    if matches is None:
+        return None, None
+    # Materialized so SQLite evaluates bm25() in the FTS query itself rather than flattening
+    # it into the GROUP BY below, where auxiliary functions aren't allowed
+    matches = matches.prefix_with("MATERIALIZED")
+    subquery = (
+        select(matches.c.fid, func.min(matches.c.rank).label("rank"))
+        .group_by(matches.c.fid)
+        .subquery("file_matches")
+    )
+    return subquery, subquery.c.rank
+
+
+@event.listens_for(File, "after_delete")
+def _delete_file_pages(mapper, connection, target):
+    delete_file_pages(connection, target.fid)
+
+
+# Keep the indexes alongside their tables for db.create_all() / db.drop_all() (used by `flask seed`)
+event.listen(Publication.__table__, "after_create", lambda target, connection, **kw: create_paper_index(connection))
+event.listen(Publication.__table__, "before_drop", lambda target, connection, **kw: drop_paper_index(connection))
+event.listen(Profile.__table__, "after_create", lambda target, connection, **kw: create_researcher_index(connection))
+event.listen(Profile.__table__, "before_drop", lambda target, connection, **kw: drop_researcher_index(connection))
+event.listen(FileText.__table__, "after_create", lambda target, connection, **kw: create_page_index(connection))
+event.listen(FileText.__table__, "before_drop", lambda target, connection, **kw: drop_page_index(connection))
+
+
+def search_terms(q):
+    """Split a raw search box string into plain word tokens"""
+    return re.findall(r"\w+", q.lower())
+
+
+def fts_match_expression(q):
+    """Build a safe FTS5 MATCH expression; the last term is prefix-matched for search-as-you-type"""
+    terms = search_terms(q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def paper_search(q):
+    """
+    Return a (subquery, rank) pair for papers matching q.
+    The subquery has `pubid` and `rank` columns; lower rank is more relevant.
+    Returns (None, None) when the backend has no full-text index.
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        match = fts_match_expression(q)
+        if not match:
+            return None, None
+        fts = literal_column(PAPER_FTS_TABLE)
+        fts_table = table(PAPER_FTS_TABLE, column("rowid"))
+        subquery = (
+            select(
+                fts_table.c.rowid.label("pubid"),
+                func.bm25(fts, *PAPER_FTS_WEIGHTS).label("rank"),
+            )
+            .where(fts.op("MATCH")(match))
+            .subquery("paper_matches")
+        )
+        return subquery, subquery.c.rank
+
+    if dialect == "postgresql":
+        terms = search_terms(q)
+        if not terms:
+            return None, None
+        ts_query = func.to_tsquery("english", " & ".join(terms[:-1] + [terms[-1] + ":*"]))
+        vector = literal_column("publications.search_vector")
+        subquery = (
+            select(
+                Publication.pubid.label("pubid"),
+                (-func.ts_rank_cd(vector, ts_query)).label("rank"),
+            )
+            .where(vector.op("@@")(ts_query))
+            .subquery("paper_matches")
+        )
+        return subquery, subquery.c.rank
+
+    return None, None
+
+
+def researcher_fts_match_expression(q):
+    """FTS5 MATCH expression where every term is prefix-matched on names and exact-matched elsewhere"""
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return " AND ".join(f'({{first_name last_name}} : "{term}"* OR "{term}")' for term in terms)
+
+
+def researcher_search(q):
+    """
+    Return a (subquery, rank) pair for researchers matching q.
+    The subquery has `user_id` and `rank` columns; lower rank is more relevant.
+    Returns (None, None) when the backend has no full-text index.
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        match = researcher_fts_match_expression(q)
+        if not match:
+            return None, None
+        fts = literal_column(RESEARCHER_FTS_TABLE)
+        fts_table = table(RESEARCHER_FTS_TABLE, column("rowid"))
+        subquery = (
+            select(
+                fts_table.c.rowid.label("user_id"),
+                func.bm25(fts, *RESEARCHER_FTS_WEIGHTS).label("rank"),
+            )
+            .where(fts.op("MATCH")(match))
+            .subquery("researcher_matches")
+        )
+        return subquery, subquery.c.rank
+
+    if dialect == "postgresql":
+        terms = search_terms(q)
+        if not terms:
+            return None, None
+        ts_query = func.to_tsquery("simple", " & ".join(f"({term}:*A | {term})" for term in terms))
+        fts_table = table(RESEARCHER_FTS_TABLE, column("user_id"), column("document"))
+        subquery = (
+            select(
+                fts_table.c.user_id.label("user_id"),
+                (-func.ts_rank_cd(fts_table.c.document, ts_query)).label("rank"),
+            )
+            .where(fts_table.c.document.op("@@")(ts_query))
+            .subquery("researcher_matches")
+        )
+        return subquery, subquery.c.rank
+
+    return None, None
+
+
+def researcher_ilike_filter(q):
+    """Fallback substring filter for backends without a full-text index"""
+    return or_(
+        User.first_name.ilike(f"%{q}%"),
+        User.last_name.ilike(f"%{q}%"),
+        Profile.institution.ilike(f"%{q}%"),
+        Profile.position.ilike(f"%{q}%"),
+        Profile.interest_links.any(ProfileInterest.interest.has(Interest.name.ilike(f"%{q}%"))),
+    )
+
+
+def paper_ilike_filter(q):
+    """Fallback substring filter for backends without a full-text index"""
+    return or_(
+        Publication.title.ilike(f"%{q}%"),
+        Publication.authors.ilike(f"%{q}%"),
+        Publication.journal.ilike(f"%{q}%"),
+        Publication.abstract.ilike(f"%{q}%"),
+        Publication.keywords.ilike(f"%{q}%"),
+    )
+
+
+@click.command("reindex-search")
+@with_appcontext
+def reindex_search():
+    """Create (if missing) and backfill the full-text search indexes."""
+    with db.engine.begin() as connection:
+        rebuild_paper_index(connection)
+        rebuild_researcher_index(connection)
+        files = rebuild_page_index(connection)
+    count = db.session.query(func.count(Publication.pubid)).scalar()
+    print(f"Paper search index rebuilt for {count} publications.")
+    count = db.session.query(func.count(Profile.pid)).scalar()
+    print(f"Researcher search index rebuilt for {count} profiles.")
+    print(f"PDF page index rebuilt for {files} files.")
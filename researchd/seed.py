@@ -1,6 +1,8 @@
 from flask.cli import with_appcontext
 from researchd import db
-from researchd.models import User, Profile, Education, Experience, File, Photo, Social, Publication
+from researchd.models import User, Profile, Education, Experience, File, Photo, Social, Publication, split_interests
+from researchd.search_index import rebuild_researcher_index
+from researchd.profile_loader import rebuild_profile_snapshots
 import click
 
 @click.command("seed")
@@ -678,9 +680,9 @@ def seed():
             department=user_data["profile"]["department"],
             bio=user_data["profile"]["bio"],
             pfp=user_data["profile"]["pfp"],
-            location=user_data["profile"]["location"],
-            research_interests=user_data["profile"]["research_interests"]
+            location=user_data["profile"]["location"]
         )
+        profile.set_interests(split_interests(user_data["profile"]["research_interests"]))
         db.session.add(profile)
         db.session.commit()
 
@@ -728,4 +730,13 @@ def seed():
             db.session.add(social)
 
     db.session.commit()
+
+    # Profiles were written directly, so build the researcher search index in one pass
+    with db.engine.begin() as connection:
+        rebuild_researcher_index(connection)
+
+    # Same for the profile page snapshots
+    rebuild_profile_snapshots()
+    db.session.commit()
+
     print(f"Sample data loaded with Alice (original) + {len(users_data)} additional users = {len(users_data) + 1} total users.")
\ No newline at end of file
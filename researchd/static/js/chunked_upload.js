@@ -0,0 +1,108 @@
+// Resumable PDF upload used by the upload/edit paper forms.
+// The file is sent in chunks to /uploads; after a dropped connection the upload asks the
+// server how much it already has and continues from there. The paper form is then
+// submitted with the upload token instead of the file.
+
+const UPLOAD_RETRIES = 5;
+
+function csrfToken() {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    return meta ? meta.getAttribute('content') : '';
+}
+
+async function uploadRequest(url, options) {
+    const response = await fetch(url, {
+        ...options,
+        headers: { 'X-CSRFToken': csrfToken(), ...(options.headers || {}) }
+    });
+    const data = await response.json().catch(() => ({ success: false, error: 'Unexpected response' }));
+    return { status: response.status, data };
+}
+
+async function uploadInChunks(file, onProgress) {
+    let { status, data } = await uploadRequest('/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ file_name: file.name, size: file.size })
+    });
+    if (status !== 201) {
+        throw new Error(data.error || 'Could not start upload');
+    }
+
+    const url = `/uploads/${data.token}`;
+    const chunkSize = data.chunk_size;
+    let offset = data.offset;
+    let failures = 0;
+
+    while (offset < file.size) {
+        try {
+            ({ status, data } = await uploadRequest(url, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream', 'Upload-Offset': String(offset) },
+                body: file.slice(offset, offset + chunkSize)
+            }));
+            if (status === 200) {
+                offset = data.offset;
+                failures = 0;
+                if (onProgress) onProgress(offset / file.size);
+                continue;
+            }
+            if (status === 413 || status === 404) {
+                throw new Error(data.error);
+            }
+        } catch (err) {
+            if (!(err instanceof TypeError)) throw err;  // fetch raises TypeError on network errors
+        }
+
+        // Network error or offset mismatch: ask where the server is and resume from there
+        failures += 1;
+        if (failures > UPLOAD_RETRIES) {
+            throw new Error('Upload keeps failing, please try again later');
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        try {
+            ({ status, data } = await uploadRequest(url, { method: 'GET' }));
+            if (status === 200) offset = data.offset;
+        } catch (err) {
+            // still offline; retry with the offset we have
+        }
+    }
+
+    ({ status, data } = await uploadRequest(`${url}/finish`, { method: 'POST' }));
+    if (status !== 200) {
+        throw new Error(data.error || 'Could not finish upload');
+    }
+    return data.token;
+}
+
+// Send the form's PDF through the chunked upload before submitting the rest of the form
+function useChunkedUpload(form) {
+    const fileInput = form.querySelector('input[type="file"]');
+    const tokenInput = form.querySelector('input[name="upload_token"]');
+    const status = document.getElementById('upload-progress');
+    if (!fileInput || !tokenInput || !window.fetch) return;
+
+    // A token left over from an earlier attempt belongs to the previous file
+    fileInput.addEventListener('change', () => { tokenInput.value = ''; });
+
+    form.addEventListener('submit', async function(event) {
+        if (!fileInput.files.length || tokenInput.value) return;
+        event.preventDefault();
+
+        const submitButton = form.querySelector('[type="submit"]');
+        if (submitButton) submitButton.disabled = true;
+        try {
+            tokenInput.value = await uploadInChunks(fileInput.files[0], fraction => {
+                if (status) status.textContent = `Uploading... ${Math.round(fraction * 100)}%`;
+            });
+            if (status) status.textContent = 'Upload complete, saving paper...';
+            fileInput.disabled = true;  // the token replaces the file in the form
+            // The WTForms submit field (name="submit") shadows form.submit, so call the method directly
+            HTMLFormElement.prototype.submit.call(form);
+        } catch (err) {
+            console.error(err);
+            if (status) status.textContent = `❌ ${err.message}`;
+            if (submitButton) submitButton.disabled = false;
+        }
+    });
+}
@@ -7,6 +7,10 @@ function resetForm() {
 
 // Character counters and file preview
 document.addEventListener('DOMContentLoaded', function() {
+    // Large PDFs go up in resumable chunks before the form is submitted
+    const tokenInput = document.querySelector('input[name="upload_token"]');
+    if (tokenInput) useChunkedUpload(tokenInput.form);
+
     // Abstract character counter
     const abstractTextarea = document.querySelector('textarea[name="abstract"]');
     if (abstractTextarea) {
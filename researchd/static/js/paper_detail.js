@@ -94,12 +94,32 @@ document.getElementById('next').addEventListener('click', onNextPage);
 document.getElementById('zoom_in').addEventListener('click', zoomIn);
 document.getElementById('zoom_out').addEventListener('click', zoomOut);
 
+// Jump to a page from "#page=N" (search hits link here)
+function pageFromHash() {
+    const match = window.location.hash.match(/page=(\d+)/);
+    return match ? parseInt(match[1], 10) : null;
+}
+
+function goToPage(num) {
+    if (!pdfDoc || !num) return;
+    pageNum = Math.min(Math.max(num, 1), pdfDoc.numPages);
+    queueRenderPage(pageNum);
+    pdfViewer.scrollIntoView({ behavior: 'smooth' });
+}
+
+window.addEventListener('hashchange', () => goToPage(pageFromHash()));
+
 // Load the PDF from data attribute
 if (pdfUrl) {
     pdfjsLib.getDocument(pdfUrl).promise.then(function(pdfDoc_) {
         pdfDoc = pdfDoc_;
         document.getElementById('page_count').textContent = pdfDoc.numPages;
-        renderPage(pageNum);
+        const initialPage = pageFromHash();
+        if (initialPage) {
+            goToPage(initialPage);
+        } else {
+            renderPage(pageNum);
+        }
     });
 }
 
@@ -152,6 +152,13 @@ function changeProfilePic(input) {
             return;
         }
         
+        // The rendered sizes (srcset) belong to the old picture until the new one is processed
+        const profilePic = document.getElementById('profile-pic');
+        profilePic.removeAttribute('srcset');
+        if (profilePic.parentElement.tagName === 'PICTURE') {
+            profilePic.parentElement.querySelectorAll('source').forEach(source => source.remove());
+        }
+
         // Preview the image immediately
         const reader = new FileReader();
         reader.onload = function(e) {
@@ -5,6 +5,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const interestsFilter = document.getElementById('interestsFilter');
     const journalFilter = document.getElementById('journalFilter');
     const yearFilter = document.getElementById('yearFilter');
+    const fulltextFilter = document.getElementById('fulltextFilter');
     const sortSelect = document.getElementById('sortSelect');
     const searchTypeRadios = document.querySelectorAll('input[name="type"]');
     const researcherFilters = document.getElementById('researcherFilters');
@@ -18,6 +19,7 @@ document.addEventListener('DOMContentLoaded', function() {
         interestsFilter.value = '';
         journalFilter.value = '';
         yearFilter.value = '';
+        if (fulltextFilter) fulltextFilter.checked = false;
         sortSelect.value = 'name';
         document.getElementById('typeResearchers').checked = true;
         updateFiltersVisibility();
@@ -56,6 +58,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         if (type === 'papers') {
             const options = [
+                { value: 'relevance', text: 'Sort by Relevance' },
                 { value: 'created_at', text: 'Sort by Date' },
                 { value: 'year', text: 'Sort by Year' },
                 { value: 'title', text: 'Sort by Title' },
@@ -72,6 +75,7 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         } else {
             const options = [
+                { value: 'relevance', text: 'Sort by Relevance' },
                 { value: 'name', text: 'Sort by Name' },
                 { value: 'institution', text: 'Sort by Institution' },
                 { value: 'position', text: 'Sort by Position' }
@@ -119,6 +123,12 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    if (fulltextFilter) {
+        fulltextFilter.addEventListener('change', function() {
+            document.getElementById('searchForm').submit();
+        });
+    }
+    
     if (sortSelect) {
         sortSelect.addEventListener('change', function() {
             document.getElementById('searchForm').submit();
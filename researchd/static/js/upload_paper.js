@@ -7,6 +7,10 @@ function resetForm() {
 
 // Character counters and file preview
 document.addEventListener('DOMContentLoaded', function() {
+    // Large PDFs go up in resumable chunks before the form is submitted
+    const tokenInput = document.querySelector('input[name="upload_token"]');
+    if (tokenInput) useChunkedUpload(tokenInput.form);
+
     // Abstract character counter
     const abstractTextarea = document.querySelector('textarea[name="abstract"]');
     if (abstractTextarea) {
@@ -61,9 +65,21 @@ document.addEventListener('DOMContentLoaded', function() {
 
                 try {
                     const response = await fetch('/extract_keywords', { method: 'POST', body: formData });
-                    const data = await response.json();
+                    if (response.status === 429) {
+                        status.textContent = "⚠️ Keyword extraction is busy, please try again shortly.";
+                        return;
+                    }
+                    let data = await response.json();
+
+                    // Extraction runs in the background; poll the job until it finishes
+                    const statusUrl = data.status_url;
+                    while (data.success && (data.status === 'queued' || data.status === 'running')) {
+                        await new Promise(resolve => setTimeout(resolve, 1500));
+                        const poll = await fetch(statusUrl);
+                        data = await poll.json();
+                    }
 
-                    if (data.success) {
+                    if (data.success && data.status === 'done') {
                         keywordsInput.value = data.keywords.join(', ');
                         status.textContent = "✅ Keywords extracted successfully.";
                     } else {
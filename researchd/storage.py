@@ -0,0 +1,346 @@
+import hashlib
+import os
+import shutil
+import uuid
+from collections import Counter
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select, insert, update, delete, func
+from sqlalchemy.orm import Session
+import click
+from . import db
+from .models import File, Blob
+from .extraction_cache import HASH_CHUNK_SIZE
+
+# Uploads are stored once per distinct content under static/uploads, named by their
+# SHA-256 and fanned out over two directory levels (ab/cd/<sha256>.pdf) so no single
+# directory grows too large. File rows point at the blob by path and hash; the blobs
+# table counts those references and a blob is deleted from disk once nothing uses it.
+
+
+def storage_root():
+    return os.path.join(current_app.root_path, "static", "uploads")
+
+
+def blob_path(sha256, extension="pdf"):
+    """Relative path of the blob for a content hash"""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+
+def is_blob_path(file_path, sha256):
+    return sha256 is not None and file_path == blob_path(sha256, file_extension(file_path))
+
+
+def file_extension(file_path):
+    return os.path.splitext(file_path)[1].lstrip(".").lower() or "pdf"
+
+
+# Leading bytes of the formats users upload -> (MIME type, file_type/extension)
+FILE_SIGNATURES = (
+    (b"%PDF-", "application/pdf", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"GIF87a", "image/gif", "gif"),
+    (b"GIF89a", "image/gif", "gif"),
+)
+SNIFF_BYTES = 16
+
+
+class UnsupportedFileType(Exception):
+    """Raised when an upload's content isn't one of the accepted types"""
+
+
+class BlobRemoved(Exception):
+    """Raised on flush when a stored file that an upload re-used was deleted before it was committed"""
+
+
+class StoredFile:
+    """Where an ingested upload was stored and what was learned while reading it"""
+
+    def __init__(self, file_path, sha256, size, mime_type, file_type, data=None):
+        self.file_path = file_path  # relative to static/uploads
+        self.sha256 = sha256
+        self.size = size
+        self.mime_type = mime_type
+        self.file_type = file_type
+        self.data = data  # the file's bytes when the caller asked to keep them, e.g. for text extraction
+
+
+def sniff_type(head):
+    """(MIME type, file_type) from a file's first bytes, judged by content rather than its name"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    for signature, mime_type, file_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type, file_type
+    return "application/octet-stream", "bin"
+
+
+def ingest_upload(file_storage, allowed_types=("pdf",), keep_data=False):
+    """
+    Store an upload in a single read of its stream: the bytes are written to a temporary
+    file while the SHA-256 and size are computed and the type is sniffed from the first
+    chunk, then the file is renamed to its blob path (or dropped if that content is
+    already stored). With keep_data the bytes are also returned, so text extraction can
+    work from memory instead of reading the file back.
+    """
+    stream = file_storage.stream
+    if stream.seekable():
+        stream.seek(0)
+
+    incoming = os.path.join(storage_root(), ".incoming")
+    os.makedirs(incoming, exist_ok=True)
+    temporary = os.path.join(incoming, f"{uuid.uuid4().hex}.tmp")
+
+    digest = hashlib.sha256()
+    size = 0
+    chunks = []
+    mime_type = file_type = None
+    try:
+        with open(temporary, "wb") as f:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+                if mime_type is None:
+                    mime_type, file_type = sniff_type(chunk[:SNIFF_BYTES])
+                    if allowed_types and file_type not in allowed_types:
+                        raise UnsupportedFileType(f"Only {', '.join(t.upper() for t in allowed_types)} files are allowed")
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                if keep_data:
+                    chunks.append(chunk)
+        if size == 0:
+            raise UnsupportedFileType("The uploaded file is empty")
+
+        sha256 = digest.hexdigest()
+        relative, _ = place_blob(temporary, sha256, file_type)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return StoredFile(relative, sha256, size, mime_type, file_type, b"".join(chunks) if keep_data else None)
+
+
+def place_blob(source, sha256, extension="pdf"):
+    """
+    Move an already hashed file into the blob store, or drop it if identical content is stored.
+    Returns (relative path, size).
+    """
+    relative = blob_path(sha256, extension)
+    path = os.path.join(storage_root(), relative)
+    if os.path.exists(path):
+        os.remove(source)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        shutil.move(source, temporary)  # may cross filesystems, so rename only once it's alongside
+        os.replace(temporary, path)
+    return relative, os.path.getsize(path)
+
+
+def _load_previous_hash(target, value, oldvalue, initiator):
+    pass
+
+
+# Keep the old hash available when a File is re-pointed, so its blob can be released
+event.listen(File.sha256, "set", _load_previous_hash, active_history=True)
+
+
+def collect_blob_changes(session):
+    """Reference count changes for every pending File insert, delete and re-point"""
+    changes = Counter()
+    blobs = {}  # sha256 -> (file_path, size) for blobs that may need a row
+
+    for obj in session.new:
+        if isinstance(obj, File) and obj.sha256:
+            changes[obj.sha256] += 1
+            blobs[obj.sha256] = (obj.file_path, obj.file_size)
+
+    for obj in session.deleted:
+        if isinstance(obj, File):
+            getattr(obj, "sha256")  # make sure the attribute is loaded
+            history = inspect(obj).attrs.sha256.history
+            for old in [*history.deleted, *history.unchanged]:
+                if old:
+                    changes[old] -= 1
+
+    for obj in session.dirty:
+        if obj in session.deleted or not isinstance(obj, File):
+            continue
+        history = inspect(obj).attrs.sha256.history
+        if not history.has_changes():
+            continue
+        for old in history.deleted:
+            if old:
+                changes[old] -= 1
+        for new in history.added:
+            if new:
+                changes[new] += 1
+                blobs[new] = (obj.file_path, obj.file_size)
+
+    return {sha256: delta for sha256, delta in changes.items() if delta}, blobs
+
+
+def lock_blob(connection, sha256):
+    """
+    Lock one blob hash until the transaction ends, so deleting a released blob's file and
+    re-using that file in another transaction can't interleave. PostgreSQL takes an advisory
+    lock; SQLite has one writer at a time, so any write holds the lock.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(select(func.pg_advisory_xact_lock(func.hashtext(sha256))))
+    else:
+        connection.execute(delete(Blob.__table__).where(Blob.sha256 == sha256, Blob.ref_count <= 0))
+
+
+def apply_blob_changes(connection, changes, blobs):
+    """Add the deltas to blobs.ref_count; returns {sha256: file_path} of blobs no longer referenced"""
+    table = Blob.__table__
+    released = {}
+    for sha256, delta in changes.items():
+        key = table.c.sha256 == sha256
+        result = connection.execute(update(table).where(key).values(ref_count=table.c.ref_count + delta))
+        if result.rowcount == 0 and delta > 0:
+            file_path, size = blobs[sha256]
+            # place_blob may have found this file on disk just before a release deleted it;
+            # under the lock the release has either finished or waits for this commit
+            lock_blob(connection, sha256)
+            if has_app_context() and not os.path.isfile(os.path.join(storage_root(), file_path)):
+                raise BlobRemoved("The stored file was removed while saving; please upload it again")
+            connection.execute(insert(table).values(sha256=sha256, file_path=file_path, size=size, ref_count=delta))
+        elif delta < 0:
+            row = connection.execute(select(table.c.file_path, table.c.ref_count).where(key)).first()
+            if row is not None and row.ref_count <= 0:
+                connection.execute(delete(table).where(key))
+                released[sha256] = row.file_path
+    return released
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_blob_changes(session, flush_context, instances):
+    # Hashes of deleted rows must be read before the DELETE is issued
+    changes, blobs = collect_blob_changes(session)
+    if changes:
+        session.info.setdefault("blob_changes", Counter()).update(changes)
+        session.info.setdefault("blob_paths", {}).update(blobs)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_blob_changes(session, flush_context):
+    changes = session.info.pop("blob_changes", None)
+    blobs = session.info.pop("blob_paths", {})
+    if not changes:
+        return
+    released = session.info.setdefault("released_blobs", {})
+    for sha256, delta in changes.items():
+        if delta > 0:
+            released.pop(sha256, None)  # referenced again before the commit
+    released.update(apply_blob_changes(session.connection(), changes, blobs))
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_blobs(session):
+    released = session.info.pop("released_blobs", None)
+    if not released or not has_app_context():
+        return
+    # The session can't run SQL here; a separate transaction checks nothing has
+    # referenced the blob again since this one committed, and keeps the blob locked
+    # until the file is gone (see apply_blob_changes for the other side)
+    with db.engine.begin() as connection:
+        for sha256, file_path in released.items():
+            lock_blob(connection, sha256)
+            if connection.execute(select(Blob.sha256).where(Blob.sha256 == sha256)).first() is not None:
+                continue
+            try:
+                os.remove(os.path.join(storage_root(), file_path))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing unreferenced blob {file_path}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_blob_changes(session):
+    session.info.pop("blob_changes", None)
+    session.info.pop("blob_paths", None)
+    session.info.pop("released_blobs", None)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, destination):
+    """Place source at destination (hard link when possible), leaving the source in place"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    temporary = f"{destination}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(source, temporary)
+    except OSError:
+        shutil.copy2(source, temporary)
+    os.replace(temporary, destination)
+
+
+@click.command("migrate-uploads")
+@click.option("--batch-size", default=100, show_default=True, help="Files per commit.")
+@with_appcontext
+def migrate_uploads(batch_size):
+    """Move uploads from the flat static/uploads layout into content-addressed blobs."""
+    from .profile_loader import refresh_profile_snapshot
+
+    root = storage_root()
+    records = [record for record in File.query.order_by(File.fid).all()
+               if "://" not in record.file_path and not is_blob_path(record.file_path, record.sha256)]
+    print(f"{len(records)} files to migrate.")
+
+    migrated = missing = 0
+    hashes = set()
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        sources = {}  # absolute path -> old relative path
+        user_ids = set()
+        for record in batch:
+            old_path = record.file_path
+            source = os.path.join(root, old_path)
+            if not os.path.isfile(source):
+                print(f"Missing on disk, left as is: {record.file_path}")
+                missing += 1
+                continue
+            sha256 = hash_file(source)
+            relative = blob_path(sha256, file_extension(record.file_path))
+            destination = os.path.join(root, relative)
+            # The old file stays until the new paths are committed, so an interrupted run can be repeated
+            if not os.path.exists(destination):
+                link_or_copy(source, destination)
+            record.file_path = relative
+            record.sha256 = sha256
+            record.file_size = os.path.getsize(destination)
+            sources[source] = old_path
+            hashes.add(sha256)
+            user_ids.add(record.profile.user_id)
+            migrated += 1
+
+        try:
+            # Download links are baked into the profile snapshots
+            for user_id in user_ids:
+                refresh_profile_snapshot(user_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error migrating uploads, stopping: {e}")
+            raise SystemExit(1)
+
+        for source, old_path in sources.items():
+            # Another row may still point at the old file and be migrated in a later batch
+            if File.query.filter_by(file_path=old_path).first() is not None:
+                continue
+            try:
+                os.remove(source)
+            except OSError as e:
+                print(f"Could not remove {source}: {e}")
+        print(f"[{min(start + batch_size, len(records))}/{len(records)}] migrated")
+
+    print(f"Uploads migrated: {migrated} files stored as {len(hashes)} blobs, {missing} missing on disk.")
@@ -0,0 +1,267 @@
+import heapq
+import os
+import shutil
+import time
+from datetime import datetime
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+import click
+from . import db
+from .models import File, Blob, Profile, UploadSession
+from .storage import storage_root
+from .avatars import AVATAR_DIRECTORY, AVATAR_SIZES, DEFAULT_PICTURE
+from .thumbnails import thumbnail_root, thumbnail_name
+from .chunked_upload import spool_directory
+
+# Reconciles the files on disk with the rows that point at them. Each storage area is
+# listed one directory at a time in sorted order, its references are read from the
+# database in sorted keyset batches, and the two streams are merged like a sort-merge
+# join, so memory stays bounded by one directory listing and one batch of rows.
+#   orphan   - a file nothing references (e.g. left by a failed transaction); moved to
+#              instance/storage_quarantine/<run>/ unless --dry-run
+#   dangling - a row whose file is gone; File rows get missing_at set (cleared again if
+#              the file reappears), profile pictures fall back to the default picture,
+#              upload sessions are dropped
+
+QUARANTINE_DIRECTORY = "storage_quarantine"  # under the instance folder
+
+
+def sort_key(column):
+    # The merge compares paths as Python strings (code point order); PostgreSQL has to
+    # sort the same way, not by the database locale. SQLite's default collation already does.
+    if db.engine.dialect.name == "postgresql":
+        return column.collate("C")
+    return column
+
+
+def iter_column(column, batch_size, *criteria):
+    """Distinct non-null values of a column in sorted order, batch_size rows per query"""
+    key = sort_key(column)
+    last = None
+    while True:
+        query = select(column).distinct().where(column.isnot(None), *criteria)
+        if last is not None:
+            query = query.where(key > last)
+        values = db.session.execute(query.order_by(key).limit(batch_size)).scalars().all()
+        yield from values
+        if len(values) < batch_size:
+            return
+        last = values[-1]
+
+
+def iter_tree(root, relative=""):
+    """
+    (relative path, mtime) of the files under root in sorted path order. Hidden entries
+    (.incoming, temporary avatar folders) and *.tmp files belong to writes in progress.
+    """
+    try:
+        entries = list(os.scandir(os.path.join(root, relative)))
+    except FileNotFoundError:
+        return
+    listing = []
+    for entry in entries:
+        if entry.name.startswith(".") or entry.name.endswith(".tmp"):
+            continue
+        path = relative + entry.name
+        if entry.is_dir(follow_symlinks=False):
+            # "name/" sorts where the paths inside the directory sort
+            listing.append((path + "/", None))
+        elif entry.is_file(follow_symlinks=False):
+            listing.append((path, entry.stat().st_mtime))
+    for path, mtime in sorted(listing):
+        if mtime is None:
+            yield from iter_tree(root, path)
+        else:
+            yield path, mtime
+
+
+def tagged(paths, kind):
+    for path in paths:
+        yield path, kind
+
+
+def merge_compare(files, references):
+    """
+    Merge the sorted disk listing with sorted (path, kind) references. Yields
+    (path, mtime or None when not on disk, set of reference kinds) for every path in either.
+    """
+    file = next(files, None)
+    reference = next(references, None)
+    while file is not None or reference is not None:
+        if reference is None or (file is not None and file[0] < reference[0]):
+            yield file[0], file[1], set()
+            file = next(files, None)
+            continue
+        path = reference[0]
+        kinds = set()
+        while reference is not None and reference[0] == path:
+            kinds.add(reference[1])
+            reference = next(references, None)
+        mtime = None
+        if file is not None and file[0] == path:
+            mtime = file[1]
+            file = next(files, None)
+        yield path, mtime, kinds
+
+
+def upload_references(batch_size):
+    local = ~File.file_path.contains("://")
+    return [
+        ("file", iter_column(File.file_path, batch_size, local)),
+        ("marked", iter_column(File.file_path, batch_size, local, File.missing_at.isnot(None))),
+        ("blob", iter_column(Blob.file_path, batch_size)),
+    ]
+
+
+def repair_uploads(entries):
+    from .profile_loader import refresh_profile_snapshot
+
+    now = datetime.utcnow()
+    missing = [path for path, on_disk, kinds in entries if not on_disk and "file" in kinds and "marked" not in kinds]
+    found = [path for path, on_disk, kinds in entries if on_disk and "marked" in kinds]
+    # Through the ORM so updated_at and the page caches see the change
+    pids = set()
+    for record in File.query.filter(File.file_path.in_(missing)).all() if missing else []:
+        record.missing_at = now
+        pids.add(record.pid)
+    for record in File.query.filter(File.file_path.in_(found)).all() if found else []:
+        record.missing_at = None
+        pids.add(record.pid)
+    # Profile pages show the download link from their snapshot
+    for user_id in db.session.execute(select(Profile.user_id).where(Profile.pid.in_(pids))).scalars().all() if pids else []:
+        refresh_profile_snapshot(user_id)
+
+
+def picture_references(batch_size):
+    prefix = "profile_pics/"
+    pictures = iter_column(Profile.pfp, batch_size, Profile.pfp.startswith(prefix, autoescape=True))
+    avatar_directory = AVATAR_DIRECTORY[len(prefix):]
+    return [
+        ("picture", (pfp[len(prefix):] for pfp in pictures)),
+        ("avatar", (path for key in iter_column(Profile.avatar_key, batch_size)
+                    for path in sorted(f"{avatar_directory}/{key}/{size}.{extension}"
+                                       for size in AVATAR_SIZES for extension in ("jpg", "webp")))),
+    ]
+
+
+def repair_pictures(entries):
+    from .profile_loader import refresh_profile_snapshot
+
+    pictures = ["profile_pics/" + path for path, _, kinds in entries if "picture" in kinds]
+    keys = {path.split("/")[1] for path, _, kinds in entries if "avatar" in kinds}
+    profiles = Profile.query.filter(Profile.pfp.in_(pictures)).all() if pictures else []
+    for profile in profiles:
+        profile.pfp = DEFAULT_PICTURE
+        profile.avatar_key = None
+    # A missing rendered size: pages go back to the single stored picture
+    for profile in Profile.query.filter(Profile.avatar_key.in_(keys)).all() if keys else []:
+        profile.avatar_key = None
+        profiles.append(profile)
+    for user_id in {profile.user_id for profile in profiles}:
+        refresh_profile_snapshot(user_id)
+
+
+def thumbnail_references(batch_size):
+    return [("thumbnail", (thumbnail_name(sha256) for sha256 in iter_column(File.sha256, batch_size)))]
+
+
+def spool_references(batch_size):
+    return [("session", (f"{token}.part" for token in iter_column(UploadSession.token, batch_size)))]
+
+
+def repair_spool(entries):
+    tokens = [path[:-len(".part")] for path, _, _ in entries]
+    for upload in UploadSession.query.filter(UploadSession.token.in_(tokens)).all():
+        db.session.delete(upload)
+
+
+def storage_areas(app):
+    """
+    (name, root, references, repair, whether a missing file is dangling, path prefixes the
+    app writes there or None for the whole area). Only files the app wrote can be orphans.
+    """
+    return [
+        ("uploads", storage_root(), upload_references, repair_uploads, True, None),
+        # The folder also holds files from the repository (README.md, the default picture)
+        ("profile_pics", os.path.join(app.root_path, "static", "profile_pics"), picture_references, repair_pictures, True,
+         ("user_", AVATAR_DIRECTORY.split("/", 1)[1] + "/")),
+        # Thumbnails are a cache: a missing one is rendered again when it is next requested
+        ("thumbnails", thumbnail_root(app), thumbnail_references, None, False, None),
+        ("chunked_uploads", spool_directory(app), spool_references, repair_spool, True, None),
+    ]
+
+
+def quarantine_file(root, path, destination_root):
+    destination = os.path.join(destination_root, path)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.move(os.path.join(root, path), destination)
+
+
+def commit_repairs(repair, entries):
+    repair(entries)
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error marking dangling records, stopping: {e}")
+        raise SystemExit(1)
+
+
+@click.command("storage-gc")
+@click.option("--dry-run", is_flag=True, help="Only report; move no files and change no rows.")
+@click.option("--batch-size", default=500, show_default=True, help="Rows read per query and records repaired per commit.")
+@click.option("--min-age", default=3600, show_default=True,
+              help="Seconds since a file was written before it can count as orphaned (uploads in progress aren't committed yet).")
+@with_appcontext
+def storage_gc(dry_run, batch_size, min_age):
+    """Find orphaned upload files and rows pointing at missing files."""
+    run = datetime.now().strftime("%Y%m%d_%H%M%S")
+    quarantine = os.path.join(current_app.instance_path, QUARANTINE_DIRECTORY, run)
+    cutoff = time.time() - min_age
+    totals = {"orphans": 0, "quarantined": 0, "dangling": 0}
+
+    for area, root, references, repair, report_missing, owned in storage_areas(current_app):
+        streams = [tagged(paths, kind) for kind, paths in references(batch_size)]
+        orphans = dangling = 0
+        pending = []
+        for path, mtime, kinds in merge_compare(iter_tree(root), heapq.merge(*streams)):
+            if not kinds:
+                if mtime > cutoff or (owned is not None and not path.startswith(owned)):
+                    continue
+                orphans += 1
+                if dry_run:
+                    print(f"Orphan: {area}/{path}")
+                    continue
+                try:
+                    quarantine_file(root, path, os.path.join(quarantine, area))
+                    totals["quarantined"] += 1
+                    print(f"Quarantined: {area}/{path}")
+                except OSError as e:
+                    print(f"Could not quarantine {area}/{path}: {e}")
+                continue
+
+            if mtime is None and report_missing:
+                dangling += 1
+                print(f"Dangling: {area}/{path} (referenced by {', '.join(sorted(kinds))})")
+            elif mtime is None or "marked" not in kinds:
+                continue
+            if repair is not None and not dry_run:
+                pending.append((path, mtime is not None, kinds))
+                if len(pending) >= batch_size:
+                    commit_repairs(repair, pending)
+                    pending = []
+
+        if pending:
+            commit_repairs(repair, pending)
+        totals["orphans"] += orphans
+        totals["dangling"] += dangling
+        print(f"{area}: {orphans} orphaned files, {dangling} dangling records.")
+
+    summary = f"Storage check: {totals['orphans']} orphaned files, {totals['dangling']} dangling records"
+    if dry_run:
+        print(summary + " (dry run, nothing changed).")
+    elif totals["quarantined"]:
+        print(summary + f"; {totals['quarantined']} files moved to {quarantine}.")
+    else:
+        print(summary + ".")
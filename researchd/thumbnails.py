@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, url_for
+from flask.cli import with_appcontext
+import click
+from .models import File
+from .file_text import upload_path
+from .jobs import get_executor
+
+# First-page previews of uploaded PDFs, rendered once per distinct file content on the
+# background pool and cached under static/thumbnails/ab/<sha256>.jpg. Because the name is
+# the content hash a thumbnail never changes, so it is served with a year-long immutable
+# cache lifetime. The paper pages always link the preview; a missing one is queued the
+# first time it is asked for and the image is left out of the page until it exists.
+
+THUMBNAIL_WIDTH = 300
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+
+_pending = set()  # hashes this process has queued and not finished yet
+_pending_lock = threading.Lock()
+
+
+def thumbnail_root(app):
+    return os.path.join(app.root_path, "static", "thumbnails")
+
+
+def thumbnail_name(sha256):
+    """Path of a file's thumbnail relative to thumbnail_root"""
+    return f"{sha256[:2]}/{sha256}.jpg"
+
+
+def render_thumbnail(source, output_path, width=THUMBNAIL_WIDTH, quality=THUMBNAIL_QUALITY):
+    """Render the first page of a PDF (path or bytes) to a JPEG; runs in a pool process"""
+    from .pdf_text import open_pdf
+    import fitz
+
+    with open_pdf(source) as doc:
+        if doc.page_count == 0:
+            raise ValueError("PDF has no pages")
+        page = doc[0]
+        zoom = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temporary = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        pixmap.save(temporary, output="jpg", jpg_quality=quality)
+        os.replace(temporary, output_path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return output_path
+
+
+def queue_thumbnail(app, file_record, data=None):
+    """
+    Render a file's thumbnail on the background process pool unless it is cached or
+    already queued here. Passing the uploaded bytes skips reading the stored file.
+    """
+    sha256 = file_record.sha256
+    if not sha256:
+        return None
+    output_path = os.path.join(thumbnail_root(app), thumbnail_name(sha256))
+    if os.path.exists(output_path):
+        return None
+    source = data
+    if source is None:
+        source = upload_path(file_record)
+        if not source or not os.path.exists(source):
+            return None
+
+    with _pending_lock:
+        if sha256 in _pending:
+            return None
+        _pending.add(sha256)
+    future = get_executor(app).submit(render_thumbnail, source, output_path)
+    future.add_done_callback(lambda f: _finish(sha256, f))
+    return future
+
+
+def _finish(sha256, future):
+    """Runs on the executor's callback thread"""
+    with _pending_lock:
+        _pending.discard(sha256)
+    error = future.exception()
+    if error is not None:
+        print(f"Error rendering thumbnail for {sha256}: {error}")
+
+
+@click.command("build-thumbnails")
+@click.option("--all", "rebuild_all", is_flag=True, help="Re-render thumbnails that are already cached.")
+@click.option("--workers", type=int, default=None, help="PDF renderer processes (default: KEYWORD_WORKERS).")
+@with_appcontext
+def build_thumbnails(rebuild_all, workers):
+    """Render first-page thumbnails for uploaded PDFs that don't have one yet."""
+    root = thumbnail_root(current_app)
+    targets = {}
+    skipped = 0
+    for file_record in File.query.filter(File.sha256.isnot(None)).order_by(File.fid):
+        output_path = os.path.join(root, thumbnail_name(file_record.sha256))
+        if file_record.sha256 in targets or (not rebuild_all and os.path.exists(output_path)):
+            continue
+        path = upload_path(file_record)
+        if path and os.path.exists(path):
+            targets[file_record.sha256] = (path, output_path)
+        else:
+            skipped += 1
+    if not targets:
+        print(f"No thumbnails to build ({skipped} files without a local PDF).")
+        return
+
+    workers = workers or current_app.config["KEYWORD_WORKERS"]
+    built = failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(path, executor.submit(render_thumbnail, path, output_path))
+                   for path, output_path in targets.values()]
+        for path, future in futures:
+            try:
+                future.result()
+                built += 1
+            except Exception as e:
+                print(f"Could not render {path}: {e}")
+                failed += 1
+
+    elapsed = time.perf_counter() - started
+    print(f"Thumbnails built: {built}, failed: {failed}, {skipped} files without a local PDF in {elapsed:.1f}s.")
+
+
+def thumbnail_url(file_record):
+    """URL of a file's first-page preview, or None for files without a local PDF"""
+    if file_record is None or not file_record.sha256 or file_record.missing_at or "://" in file_record.file_path:
+        return None
+    return url_for("main.paper_thumbnail", sha256=file_record.sha256)
+
+
+def init_app(app):
+    app.add_template_global(thumbnail_url)
@@ -0,0 +1,129 @@
+"""
+Cold-start benchmark: import time and memory of create_app().
+
+Each run starts a fresh interpreter, imports the app package and builds the app, then
+reports wall time and resident memory, plus which heavy modules ended up loaded.
+
+    python scripts/benchmark_startup.py                     # default (lazy) startup
+    python scripts/benchmark_startup.py --preload           # startup with PyMuPDF preloaded
+    python scripts/benchmark_startup.py --save baseline.json
+    python scripts/benchmark_startup.py --baseline baseline.json --max-regression 0.2
+
+With --baseline the script exits non-zero when median time or RSS grows by more than
+--max-regression (a fraction) over the saved numbers.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("fitz", "pymupdf", "keybert", "torch", "sentence_transformers", "transformers")
+
+# Runs in the child interpreter; prints one JSON line
+CHILD = r"""
+import json, os, resource, sys, time
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+preload = sys.argv[1] == "1"
+start_rss = rss_kb()
+started = time.perf_counter()
+import researchd
+imported = time.perf_counter()
+app = researchd.create_app(preload=preload)
+finished = time.perf_counter()
+
+print(json.dumps({
+    "import_seconds": imported - started,
+    "create_app_seconds": finished - imported,
+    "total_seconds": finished - started,
+    "rss_kb": rss_kb(),
+    "rss_delta_kb": rss_kb() - start_rss,
+    "heavy_modules": sorted(m for m in %(heavy)r if m in sys.modules),
+}))
+""" % {"heavy": HEAVY_MODULES}
+
+
+def run_once(preload):
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, "1" if preload else "0"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Benchmark run failed with exit code {result.returncode}")
+    # create_app prints diagnostics; the measurement is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarise(runs):
+    summary = {}
+    for key in ("import_seconds", "create_app_seconds", "total_seconds", "rss_kb", "rss_delta_kb"):
+        summary[key] = statistics.median(run[key] for run in runs)
+    summary["heavy_modules"] = runs[-1]["heavy_modules"]
+    summary["runs"] = len(runs)
+    return summary
+
+
+def compare(summary, baseline, max_regression):
+    """Return a list of regressions beyond the allowed fraction"""
+    failures = []
+    for key in ("total_seconds", "rss_kb"):
+        before, after = baseline.get(key), summary[key]
+        if before and after > before * (1 + max_regression):
+            failures.append(f"{key}: {before:.3f} -> {after:.3f} (+{(after / before - 1) * 100:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure create_app() import time and memory.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure (median is reported).")
+    parser.add_argument("--preload", action="store_true", help="Build the app with preload=True.")
+    parser.add_argument("--save", help="Write the summary to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a summary saved with --save.")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed growth over the baseline (fraction).")
+    args = parser.parse_args()
+
+    runs = [run_once(args.preload) for _ in range(args.runs)]
+    summary = summarise(runs)
+
+    print(f"create_app() startup over {summary['runs']} runs (median, preload={'on' if args.preload else 'off'}):")
+    print(f"  import researchd: {summary['import_seconds'] * 1000:.0f} ms")
+    print(f"  create_app():     {summary['create_app_seconds'] * 1000:.0f} ms")
+    print(f"  total:            {summary['total_seconds'] * 1000:.0f} ms")
+    print(f"  RSS:              {summary['rss_kb'] / 1024:.1f} MB (+{summary['rss_delta_kb'] / 1024:.1f} MB)")
+    print(f"  heavy modules:    {', '.join(summary['heavy_modules']) or 'none'}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(summary, baseline, args.max_regression)
+        if failures:
+            print("Startup regression against baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("Within baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import pytest
+from researchd import create_app, db
+from researchd.models import User, Profile, File
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "test.sqlite"))
+    monkeypatch.setenv("FILE_SERVING", "x-accel-redirect")
+    app = create_app()
+    app.config["TESTING"] = True
+    # Uploads resolve under root_path/static/uploads
+    monkeypatch.setattr(app, "root_path", str(tmp_path))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def add_upload(root, file_name):
+    user = User(email="owner@example.com", first_name="Test", last_name="Owner")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.flush()
+    profile = Profile(user_id=user.id)
+    db.session.add(profile)
+    db.session.flush()
+    file = File(pid=profile.pid, file_name=file_name, file_type="pdf", file_path="ab/stored.pdf")
+    db.session.add(file)
+    db.session.commit()
+    path = os.path.join(root, "static", "uploads", "ab", "stored.pdf")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+    return file.fid
+
+
+@pytest.mark.parametrize("file_name, fallback, encoded", [
+    ('a"b\\c.pdf', "a_b_c.pdf", "a%22b%5Cc.pdf"),
+    ("résumé.pdf", "resume.pdf", "r%C3%A9sum%C3%A9.pdf"),
+    ("plain.pdf", "plain.pdf", None),
+])
+def test_accel_redirect_content_disposition(app, file_name, fallback, encoded):
+    fid = add_upload(app.root_path, file_name)
+    response = app.test_client().get(f"/public-download/{fid}")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == "/protected-uploads/ab/stored.pdf"
+    expected = f'attachment; filename="{fallback}"'
+    if encoded:
+        expected += f"; filename*=UTF-8''{encoded}"
+    assert response.headers["Content-Disposition"] == expected
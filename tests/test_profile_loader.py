@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import event
+from researchd import create_app, db
+from researchd.models import (User, Profile, Publication, File, Social, Interest, ProfileInterest,
+                              ExternalRole, Achievement)
+from researchd.profile_loader import load_profile_page, refresh_profile_snapshot
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "test.sqlite"))
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def add_researcher(email, count):
+    """A researcher with `count` papers (each with a file), roles, achievements, socials and interests"""
+    user = User(email=email, first_name="Test", last_name="Researcher")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.flush()
+    profile = Profile(user_id=user.id, institution="Example University")
+    db.session.add(profile)
+    db.session.flush()
+    for i in range(count):
+        file = File(pid=profile.pid, file_name=f"paper_{i}.pdf", file_type="pdf", file_path=f"https://example.com/{email}/{i}.pdf")
+        db.session.add(file)
+        db.session.flush()
+        db.session.add(Publication(pid=profile.pid, title=f"Paper {i}", year=2000 + i, fid=file.fid))
+        db.session.add(ExternalRole(pid=profile.pid, role_title=f"Role {i}", organization="Org", start_year=2000 + i))
+        db.session.add(Achievement(pid=profile.pid, title=f"Award {i}", year=2000 + i))
+        db.session.add(Social(pid=profile.pid, platform=f"Site {i}", url=f"https://example.com/{i}"))
+        interest = Interest(name=f"{email} topic {i}")
+        db.session.add(interest)
+        db.session.flush()
+        db.session.add(ProfileInterest(pid=profile.pid, iid=interest.iid, position=i))
+    db.session.commit()
+    user_id = user.id
+    db.session.remove()  # start counting with an empty identity map
+    return user_id
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, "before_cursor_execute", self)
+
+
+def count_statements(action):
+    with StatementCounter() as counter:
+        action()
+    return counter.count
+
+
+def test_loader_query_count_does_not_grow_with_data(app):
+    small = add_researcher("small@example.com", 1)
+    large = add_researcher("large@example.com", 25)
+
+    def load(user_id):
+        page = load_profile_page(user_id)
+        # Touch everything the template reads, so lazy loads would be counted
+        for publication in page["publications"]:
+            publication.file and publication.file.file_path
+        page["profile"].socials, page["profile"].interest_names, page["profile"].user.first_name
+        db.session.remove()
+
+    small_count = count_statements(lambda: load(small))
+    large_count = count_statements(lambda: load(large))
+    assert small_count == large_count
+    assert large_count <= 6
+
+
+@pytest.mark.parametrize("snapshot", [True, False])
+def test_profile_page_query_count_does_not_grow_with_data(app, snapshot):
+    small = add_researcher("small@example.com", 1)
+    large = add_researcher("large@example.com", 25)
+    if snapshot:
+        refresh_profile_snapshot(small)
+        refresh_profile_snapshot(large)
+        db.session.commit()
+        db.session.remove()
+
+    client = app.test_client()
+    counts = []
+    for user_id in (small, large):
+        with StatementCounter() as counter:
+            response = client.get(f"/profile/{user_id}")
+        assert response.status_code == 200
+        counts.append(counter.count)
+    assert counts[0] == counts[1]
@@ -0,0 +1,51 @@
+import re
+from datetime import datetime, timedelta
+import pytest
+from researchd import create_app, db
+from researchd.models import User, Profile, Publication
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///" + str(tmp_path / "test.sqlite"))
+    monkeypatch.setenv("SEARCH_PAGINATION", "keyset")
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def add_papers(count, undated):
+    """`count` papers by one researcher; the first `undated` have no created_at"""
+    user = User(email="author@example.com", first_name="Test", last_name="Author")
+    user.set_password("password123")
+    db.session.add(user)
+    db.session.flush()
+    profile = Profile(user_id=user.id)
+    db.session.add(profile)
+    db.session.flush()
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        db.session.add(Publication(pid=profile.pid, title=f"Paper {i:02d}", year=2000,
+                                   created_at=start + timedelta(days=i)))
+    db.session.flush()
+    db.session.execute(db.update(Publication).where(Publication.title < f"Paper {undated:02d}").values(created_at=None))
+    db.session.commit()
+
+
+def test_date_sort_keyset_pages_include_undated_papers(app):
+    add_papers(25, undated=7)
+    client = app.test_client()
+    url = "/search?type=papers&sort=date"
+    pages = []
+    while url and len(pages) < 10:
+        html = client.get(url).get_data(as_text=True)
+        pages.append(set(re.findall(r"Paper \d\d", html)))
+        cursor = re.search(r'href="([^"]*paper_cursor=[^"]+)"[^>]*aria-label="Next"', html)
+        url = cursor.group(1).replace("&amp;", "&") if cursor else None
+    seen = [title for page in pages for title in page]
+    assert len(pages) == 3
+    assert len(seen) == len(set(seen)) == 25